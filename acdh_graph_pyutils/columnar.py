@@ -0,0 +1,168 @@
+import heapq
+from array import array
+from itertools import islice
+from typing import IO, Iterable, Iterator
+from rdflib import Graph, Literal, URIRef
+from rdflib.plugins.serializers.nt import _quoteLiteral
+from acdh_graph_pyutils.graph import write_lines
+
+
+# triples are sorted as single packed integer keys if the three ids fit into this many bits
+PACKED_KEY_BITS = 64
+
+
+class ColumnarTriples:
+    """
+    A compact, write-optimized triple accumulator.
+    Terms are dictionary encoded to integer ids and triples are stored in three
+    array('q') columns (24 bytes per triple) instead of rdflib's nested term indexes.
+    Duplicates are kept until dedupe() is called (done by the exports).
+    """
+
+    def __init__(self) -> None:
+        self._ids = {}
+        self._terms = []
+        self.subjects = array("q")
+        self.predicates = array("q")
+        self.objects = array("q")
+        self._deduped = True
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self.triples()
+
+    def term_id(
+        self,
+        term: URIRef | Literal,
+    ) -> int:
+        """
+        Returns the integer id of a term, adding it to the term dictionary if needed.
+        """
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+        return term_id
+
+    def add(
+        self,
+        triple: tuple,
+    ) -> "ColumnarTriples":
+        """
+        Adds a (subject, predicate, object) triple.
+        """
+        s, p, o = triple
+        self.subjects.append(self.term_id(s))
+        self.predicates.append(self.term_id(p))
+        self.objects.append(self.term_id(o))
+        self._deduped = False
+        return self
+
+    def addN(
+        self,
+        quads: Iterable[tuple],
+    ) -> "ColumnarTriples":
+        """
+        Adds (subject, predicate, object, context) quads, the context is ignored.
+        """
+        for s, p, o, c in quads:
+            self.add((s, p, o))
+        return self
+
+    def add_triples(
+        self,
+        triples: Iterable[tuple],
+    ) -> "ColumnarTriples":
+        """
+        Adds (subject, predicate, object) triples.
+        """
+        for triple in triples:
+            self.add(triple)
+        return self
+
+    def dedupe(
+        self,
+        chunk_size: int = 1000000,
+    ) -> int:
+        """
+        Sorts the triples by (subject, predicate, object) ids and removes duplicates.
+        Chunks of chunk_size triples are sorted into compact runs, which are merged into new columns:
+        peak memory is about 32 bytes per triple (runs of packed 64 bit keys) or 48 bytes
+        per triple with more than 2**21 terms (runs of id triples), plus one chunk.
+        Returns the number of unique triples.
+        """
+        if self._deduped:
+            return len(self)
+        bits = max(1, (len(self._terms) - 1).bit_length())
+        packed = 3 * bits <= PACKED_KEY_BITS
+        runs = []
+        for start in range(0, len(self), chunk_size):
+            stop = start + chunk_size
+            chunk = zip(self.subjects[start:stop], self.predicates[start:stop], self.objects[start:stop])
+            if packed:
+                runs.append(array("Q", sorted({(s << bits | p) << bits | o for s, p, o in chunk})))
+            else:
+                run = array("q")
+                for triple in sorted(set(chunk)):
+                    run.extend(triple)
+                runs.append(run)
+        # the runs hold all triples, the old columns can go before merging
+        self.subjects, self.predicates, self.objects = array("q"), array("q"), array("q")
+        if packed:
+            mask = (1 << bits) - 1
+            merged = ((key >> 2 * bits, key >> bits & mask, key & mask) for key in heapq.merge(*runs))
+        else:
+            merged = heapq.merge(*(zip(x, x, x) for x in map(iter, runs)))
+        previous = None
+        for triple in merged:
+            if triple != previous:
+                s, p, o = triple
+                self.subjects.append(s)
+                self.predicates.append(p)
+                self.objects.append(o)
+                previous = triple
+        self._deduped = True
+        return len(self)
+
+    def triples(self) -> Iterator[tuple]:
+        """
+        Yields the triples as rdflib terms.
+        """
+        terms = self._terms
+        for s, p, o in zip(self.subjects, self.predicates, self.objects):
+            yield terms[s], terms[p], terms[o]
+
+    def to_ntriples(
+        self,
+        destination: str | IO[bytes],
+        compress: bool = False,
+        chunk_size: int = 10000,
+    ) -> int:
+        """
+        Writes the unique triples as N-Triples to a file path or binary file-like object.
+        Returns the number of written triples.
+        """
+        self.dedupe()
+        n3 = [_quoteLiteral(x) if isinstance(x, Literal) else x.n3() for x in self._terms]
+        lines = (
+            f"{n3[s]} {n3[p]} {n3[o]} .\n"
+            for s, p, o in zip(self.subjects, self.predicates, self.objects)
+        )
+        return write_lines(destination, lines, compress=compress, chunk_size=chunk_size)
+
+    def to_graph(
+        self,
+        graph: Graph,
+        batch_size: int = 10000,
+    ) -> Graph:
+        """
+        Adds the unique triples to a rdflib Graph in batches via addN and returns the graph.
+        """
+        self.dedupe()
+        context = getattr(graph, "default_context", graph)
+        triples = self.triples()
+        for batch in iter(lambda: list(islice(triples, batch_size)), []):
+            graph.addN((s, p, o, context) for s, p, o in batch)
+        return graph
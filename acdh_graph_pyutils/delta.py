@@ -0,0 +1,192 @@
+import heapq
+import os
+import tempfile
+from itertools import islice
+from typing import IO, Iterable, Iterator
+from rdflib import Graph, URIRef
+from acdh_graph_pyutils.graph import stream_serialize_graph, write_lines
+
+
+def _open_lines(
+    source: str,
+) -> IO[str]:
+    if source.endswith(".gz"):
+        import gzip
+        return gzip.open(source, "rt", encoding="utf-8")
+    return open(source, encoding="utf-8")
+
+
+def _ntriples_lines(
+    stream: IO[str],
+) -> Iterator[str]:
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield f"{line}\n"
+
+
+def _unique(
+    lines: Iterable[str],
+) -> Iterator[str]:
+    previous = None
+    for line in lines:
+        if line != previous:
+            yield line
+            previous = line
+
+
+def sort_ntriples(
+    source: str,
+    destination: str,
+    chunk_size: int = 1000000,
+) -> int:
+    """
+    Sorts the lines of a N-Triples file (gzip compressed if the path ends with '.gz')
+    and removes duplicates, with an external merge sort holding at most chunk_size lines in memory.
+    Returns the number of written lines.
+    """
+    with tempfile.TemporaryDirectory() as tmp, _open_lines(source) as stream:
+        lines = _ntriples_lines(stream)
+        runs = []
+        for chunk in iter(lambda: list(islice(lines, chunk_size)), []):
+            chunk.sort()
+            runs.append(os.path.join(tmp, f"{len(runs)}.nt"))
+            with open(runs[-1], "w", encoding="utf-8") as f:
+                f.writelines(_unique(chunk))
+        streams = [open(run, encoding="utf-8") for run in runs]
+        try:
+            return write_lines(destination, _unique(heapq.merge(*streams)))
+        finally:
+            for run in streams:
+                run.close()
+
+
+def diff_sorted_ntriples(
+    old: Iterable[str],
+    new: Iterable[str],
+) -> Iterator[tuple[str, str]]:
+    """
+    Compares two sorted, duplicate free N-Triples line streams in one pass.
+    Yields ('-', line) for removed and ('+', line) for added lines.
+    """
+    old, new = iter(old), iter(new)
+    a, b = next(old, None), next(new, None)
+    while a is not None and b is not None:
+        if a == b:
+            a, b = next(old, None), next(new, None)
+        elif a < b:
+            yield "-", a
+            a = next(old, None)
+        else:
+            yield "+", b
+            b = next(new, None)
+    while a is not None:
+        yield "-", a
+        a = next(old, None)
+    while b is not None:
+        yield "+", b
+        b = next(new, None)
+
+
+def compute_delta(
+    old: str | Graph,
+    new: str | Graph,
+    added_file: str,
+    removed_file: str,
+    presorted: bool = False,
+    chunk_size: int = 1000000,
+) -> dict[str, int]:
+    """
+    Computes the triples added and removed between two builds and writes them as
+    N-Triples patch files (gzip compressed if the path ends with '.gz').
+    old and new are N-Triples dumps (e.g. from stream_serialize_graph) or graphs,
+    which are dumped first; dumps are sorted with sort_ntriples unless presorted is set,
+    so neither build is held as rdflib objects.
+    Blank nodes are compared by their labels.
+    Returns {"added": ..., "removed": ...}.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        sorted_files = []
+        for name, source in (("old", old), ("new", new)):
+            dumped = isinstance(source, Graph)
+            if dumped:
+                dump = os.path.join(tmp, f"{name}.nt")
+                stream_serialize_graph(source, dump)
+                source = dump
+            if dumped or not presorted:
+                sorted_file = os.path.join(tmp, f"{name}.sorted.nt")
+                sort_ntriples(source, sorted_file, chunk_size=chunk_size)
+                source = sorted_file
+            sorted_files.append(source)
+        with _open_lines(sorted_files[0]) as old_stream, _open_lines(sorted_files[1]) as new_stream:
+            changes = diff_sorted_ntriples(old_stream, new_stream)
+            # removed lines go to a temporary file, so both patch files are written in the same pass
+            removed_tmp = os.path.join(tmp, "removed.nt")
+            with open(removed_tmp, "w", encoding="utf-8") as removed:
+                added = write_lines(added_file, _split_changes(changes, removed))
+        with open(removed_tmp, encoding="utf-8") as f:
+            removed = write_lines(removed_file, f)
+    return {"added": added, "removed": removed}
+
+
+def _split_changes(
+    changes: Iterable[tuple[str, str]],
+    removed: IO[str],
+) -> Iterator[str]:
+    for sign, line in changes:
+        if sign == "+":
+            yield line
+        else:
+            removed.write(line)
+
+
+def _has_blank_node(
+    line: str,
+) -> bool:
+    if line.startswith("_:"):
+        return True
+    # subject and predicate IRIs cannot contain '>', the rest of the line is the object
+    end = line.index(">", line.index(">") + 1) + 1
+    return line[end:].lstrip().startswith("_:")
+
+
+def _data_blocks(
+    keyword: str,
+    patch_file: str,
+    graph: URIRef,
+    batch_size: int,
+) -> Iterator[str]:
+    with _open_lines(patch_file) as stream:
+        lines = _ntriples_lines(stream)
+        for chunk in iter(lambda: list(islice(lines, batch_size)), []):
+            body = "".join(chunk)
+            if graph is not None:
+                body = f"GRAPH <{graph}> {{\n{body}}}\n"
+            yield f"{keyword} DATA {{\n{body}}}\n"
+
+
+def delta_to_sparql_update(
+    added_file: str,
+    removed_file: str,
+    destination: str | IO[bytes],
+    graph: URIRef = None,
+    batch_size: int = 10000,
+) -> int:
+    """
+    Writes the N-Triples patch files of compute_delta as one SPARQL Update request
+    to a file path or binary file-like object: DELETE DATA operations for the removed
+    and INSERT DATA operations for the added triples, batch_size triples each,
+    in the named graph (if provided).
+    Raises ValueError for removed triples with blank nodes, before anything is written.
+    Returns the number of operations.
+    """
+    with _open_lines(removed_file) as stream:
+        if any(_has_blank_node(line) for line in _ntriples_lines(stream)):
+            raise ValueError("DELETE DATA does not allow blank nodes.")
+    blocks = (
+        block
+        for keyword, patch_file in (("DELETE", removed_file), ("INSERT", added_file))
+        for block in _data_blocks(keyword, patch_file, graph, batch_size)
+    )
+    operations = (f";\n{block}" if index else block for index, block in enumerate(blocks))
+    return write_lines(destination, operations)
@@ -1,15 +1,27 @@
-from typing import TypedDict
+from itertools import islice
+from typing import IO, TYPE_CHECKING, Iterable, TypedDict
 from rdflib import Graph, Literal, URIRef, Namespace, plugin, ConjunctiveGraph
-from rdflib.store import Store
+from rdflib.store import Store, NO_STORE
 from rdflib.namespace import OWL, RDF, RDFS
 from acdh_graph_pyutils.namespaces import NAMESPACES
+from acdh_graph_pyutils.instrumentation import count_triples, count_triples_of, instrumented
 
+if TYPE_CHECKING:
+    from acdh_graph_pyutils.columnar import ColumnarTriples
+    from acdh_graph_pyutils.sameas import SameAsIndex
+
+
+plugin.register("SQLite", Store, "acdh_graph_pyutils.sqlite_store", "SQLiteStore")
+
+# identifier of graphs created without one on a disk store, so they can be found again after reopening
+DISK_GRAPH_IDENTIFIER = URIRef("urn:acdh-graph-pyutils:default")
 
 Namespaces = TypedDict('Namespaces', {
     "key": Namespace,
 })
 
 
+@instrumented
 def create_empty_graph(
     namespaces: Namespaces = NAMESPACES,
     identifier: URIRef = None,
@@ -17,13 +29,17 @@ def create_empty_graph(
 ) -> Graph:
     """
     Returns an empty graph with the namespaces defined in the namespaces.py file.
+    Without identifier, graphs on a store from create_disk_store use DISK_GRAPH_IDENTIFIER.
     """
+    if identifier is None:
+        identifier = getattr(store, "default_graph_identifier", None)
     g = Graph(identifier=identifier, store=store)
     for key, value in namespaces.items():
         g.bind(key, value)
     return g
 
 
+@instrumented
 def create_custom_triple(
     graph: Graph,
     subject: URIRef,
@@ -34,9 +50,11 @@ def create_custom_triple(
     Returns a rdflib Graph object containing a custom rdflib triple object.
     """
     graph.add((subject, predicate, object))
+    count_triples(predicate)
     return graph
 
 
+@instrumented
 def create_type_triple(
     graph: Graph,
     subject: URIRef,
@@ -46,9 +64,11 @@ def create_type_triple(
     Returns a rdflib Graph object containing a RDF.type triple object.
     """
     graph.add((subject, RDF.type, object))
+    count_triples(RDF.type)
     return graph
 
 
+@instrumented
 def create_label_triple(
     graph: Graph,
     subject: URIRef,
@@ -58,9 +78,11 @@ def create_label_triple(
     Returns a rdflib Graph object containing a RDF.label triple object.
     """
     graph.add((subject, RDFS.label, object))
+    count_triples(RDFS.label)
     return graph
 
 
+@instrumented
 def create_value_triple(
     graph: Graph,
     subject: URIRef,
@@ -70,34 +92,268 @@ def create_value_triple(
     Returns a rdflib Graph object containing a RDF.value triple object.
     """
     graph.add((subject, RDF.value, object))
+    count_triples(RDF.value)
     return graph
 
 
+@instrumented
 def create_sameAs_triple(
     graph: Graph,
     subject: URIRef,
     object: URIRef,
+    index: "SameAsIndex" = None,
 ) -> Graph:
     """
     Returns a rdflib Graph object containing a OWL.sameAs triple object.
+    The link is also added to the sameas.SameAsIndex index (if provided).
     """
     graph.add((subject, OWL.sameAs, object))
+    count_triples(OWL.sameAs)
+    if index is not None:
+        index.add(subject, object)
     return graph
 
 
+class TripleBuffer:
+    """
+    Collects triples in a list and adds them to a rdflib Graph in bulk
+    via Graph.addN once batch_size triples are buffered.
+    Call flush() (or use it as a context manager) to add the remaining triples.
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        batch_size: int = 10000,
+    ) -> None:
+        self.graph = graph
+        self.batch_size = batch_size
+        self.triples = []
+
+    def __len__(self) -> int:
+        return len(self.triples)
+
+    def __enter__(self) -> "TripleBuffer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+    def add(
+        self,
+        subject: URIRef,
+        predicate: Namespace,
+        object: URIRef | Literal,
+    ) -> "TripleBuffer":
+        """
+        Buffers a custom triple.
+        """
+        self.triples.append((subject, predicate, object))
+        if len(self.triples) >= self.batch_size:
+            self.flush()
+        return self
+
+    def add_type(
+        self,
+        subject: URIRef,
+        object: URIRef,
+    ) -> "TripleBuffer":
+        """
+        Buffers a RDF.type triple.
+        """
+        return self.add(subject, RDF.type, object)
+
+    def add_label(
+        self,
+        subject: URIRef,
+        object: Literal,
+    ) -> "TripleBuffer":
+        """
+        Buffers a RDFS.label triple.
+        """
+        return self.add(subject, RDFS.label, object)
+
+    def add_value(
+        self,
+        subject: URIRef,
+        object: Literal,
+    ) -> "TripleBuffer":
+        """
+        Buffers a RDF.value triple.
+        """
+        return self.add(subject, RDF.value, object)
+
+    def add_sameAs(
+        self,
+        subject: URIRef,
+        object: URIRef,
+        index: "SameAsIndex" = None,
+    ) -> "TripleBuffer":
+        """
+        Buffers a OWL.sameAs triple and adds the link to index (if provided).
+        """
+        if index is not None:
+            index.add(subject, object)
+        return self.add(subject, OWL.sameAs, object)
+
+    def flush(self) -> Graph:
+        """
+        Adds all buffered triples to the graph and returns the graph.
+        """
+        if self.triples:
+            context = getattr(self.graph, "default_context", self.graph)
+            self.graph.addN((s, p, o, context) for s, p, o in self.triples)
+            count_triples_of(self.triples)
+            self.triples = []
+        return self.graph
+
+
+class _ContextSink:
+    """
+    N-Triples parser sink adding the parsed triples to one context in batches.
+    """
+
+    def __init__(
+        self,
+        graph: ConjunctiveGraph,
+        context: Graph,
+        batch_size: int,
+    ) -> None:
+        self.graph = graph
+        self.context = context
+        self.batch_size = batch_size
+        self.quads = []
+
+    def triple(self, s, p, o) -> None:
+        self.quads.append((s, p, o, self.context))
+        if len(self.quads) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.graph.addN(self.quads)
+        self.quads = []
+
+
+@instrumented
+def merge_graphs(
+    graphs: Iterable[Graph | tuple[URIRef, bytes | str]],
+    conjunctive_graph: ConjunctiveGraph = None,
+    batch_size: int = 10000,
+) -> ConjunctiveGraph:
+    """
+    Loads many graphs into their own named graph of a conjunctive graph via bulk addN.
+    graphs are rdflib Graph objects (named by their identifier) or
+    (identifier, N-Triples data) tuples, parsed without building an intermediate Graph.
+    Namespace bindings of the sources are not copied; a new conjunctive graph
+    (in a memory store) gets the NAMESPACES bound once.
+    Use stream_serialize_graph(..., format="nquads") to write the result.
+    Returns the conjunctive graph.
+    """
+    from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+    if conjunctive_graph is None:
+        conjunctive_graph = create_conjunctive_graph(store=create_memory_store())
+        for key, value in NAMESPACES.items():
+            conjunctive_graph.bind(key, value)
+    for source in graphs:
+        if isinstance(source, Graph):
+            context = conjunctive_graph.get_context(source.identifier)
+            triples = iter(source)
+            for batch in iter(lambda: list(islice(triples, batch_size)), []):
+                conjunctive_graph.addN((s, p, o, context) for s, p, o in batch)
+        else:
+            identifier, data = source
+            sink = _ContextSink(conjunctive_graph, conjunctive_graph.get_context(identifier), batch_size)
+            W3CNTriplesParser(sink).parsestring(data, bnode_context={})
+            sink.flush()
+    return conjunctive_graph
+
+
+@instrumented
 def serialize_graph(
     graph: Graph,
     format: str = "ttl",
     to_file: str = "./graph.ttl",
-) -> Graph:
+    return_string: bool = False,
+) -> str | None:
     """
-    Returns a serialized graph.
+    Serializes a graph to to_file (if provided).
+    Returns the serialized graph as string if return_string is set
+    or no file is provided.
     """
     if isinstance(to_file, str):
-        graph.serialize(format=format, destination=to_file)
+        if not return_string:
+            graph.serialize(format=format, destination=to_file)
+            return None
+        data = graph.serialize(format=format)
+        with open(to_file, "w", encoding="utf-8") as f:
+            f.write(data)
+        return data
     return graph.serialize(format=format)
 
 
+@instrumented
+def stream_serialize_graph(
+    graph: Graph,
+    destination: str | IO[bytes],
+    format: str = "nt",
+    compress: bool = False,
+    chunk_size: int = 10000,
+) -> int:
+    """
+    Writes a graph line by line as N-Triples ('nt') or N-Quads ('nquads')
+    to a file path or binary file-like object, chunk_size lines per write.
+    The output is gzip compressed if compress is set or the path ends with '.gz'.
+    Returns the number of written triples.
+    """
+    from rdflib.plugins.serializers.nt import _nt_row
+    from rdflib.plugins.serializers.nquads import _nq_row
+    if format in ("nt", "nt11", "ntriples"):
+        def row(triple, context):
+            return _nt_row(triple)
+    elif format == "nquads":
+        def row(triple, context):
+            return _nq_row(triple, context.identifier)
+    else:
+        raise ValueError(f"Streaming serialization does not support format '{format}'.")
+    contexts = graph.contexts() if isinstance(graph, ConjunctiveGraph) else [graph]
+    lines = (row(triple, context) for context in contexts for triple in context)
+    return write_lines(destination, lines, compress=compress, chunk_size=chunk_size)
+
+
+def write_lines(
+    destination: str | IO[bytes],
+    lines: Iterable[str],
+    compress: bool = False,
+    chunk_size: int = 10000,
+) -> int:
+    """
+    Writes lines utf-8 encoded to a file path or binary file-like object,
+    chunk_size lines per write. The output is gzip compressed if compress is set
+    or the path ends with '.gz'. Returns the number of written lines.
+    """
+    import gzip
+    if isinstance(destination, str):
+        if compress or destination.endswith(".gz"):
+            stream = gzip.open(destination, "wb")
+        else:
+            stream = open(destination, "wb")
+    elif compress:
+        stream = gzip.GzipFile(fileobj=destination, mode="wb")
+    else:
+        stream = destination
+    lines = iter(lines)
+    count = 0
+    try:
+        for chunk in iter(lambda: list(islice(lines, chunk_size)), []):
+            stream.write("".join(chunk).encode("utf-8"))
+            count += len(chunk)
+    finally:
+        if stream is not destination:
+            stream.close()
+    return count
+
+
+@instrumented
 def create_memory_store(
     store: Store = Store,
 ) -> Store:
@@ -108,11 +364,48 @@ def create_memory_store(
     return store
 
 
+@instrumented
+def create_columnar_store() -> "ColumnarTriples":
+    """
+    Returns a compact, integer encoded triple accumulator for write-heavy builds,
+    exportable to N-Triples or a rdflib Graph.
+    """
+    from acdh_graph_pyutils.columnar import ColumnarTriples
+    return ColumnarTriples()
+
+
+@instrumented
+def create_disk_store(
+    path: str,
+    backend: str = "SQLite",
+    cache_size: int = 65536,
+    bulk_load: bool = False,
+    create: bool = True,
+) -> Store:
+    """
+    Returns an opened disk-backed store, persisted at path.
+    Any rdflib store plugin opened by path (e.g. 'BerkeleyDB') can be used as backend;
+    cache_size (KiB) and bulk_load only apply to the default SQLite store.
+    Graphs from create_empty_graph (and the default context of create_conjunctive_graph)
+    without identifier use DISK_GRAPH_IDENTIFIER on this store, so they are found again after reopening.
+    Call store.close() to write pending changes.
+    """
+    if backend == "SQLite":
+        store = plugin.get(backend, Store)(cache_size=cache_size, bulk_load=bulk_load)
+    else:
+        store = plugin.get(backend, Store)()
+    if store.open(path, create=create) == NO_STORE:
+        raise ValueError(f"No {backend} store found at '{path}'.")
+    store.default_graph_identifier = DISK_GRAPH_IDENTIFIER
+    return store
+
+
+@instrumented
 def create_conjunctive_graph(
     store: Store,
 ) -> ConjunctiveGraph:
     """
     Returns a conjunctive graph.
     """
-    g = ConjunctiveGraph(store=store)
+    g = ConjunctiveGraph(store=store, identifier=getattr(store, "default_graph_identifier", None))
     return g
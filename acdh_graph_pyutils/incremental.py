@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Iterable
+from lxml.etree import Element
+from rdflib import ConjunctiveGraph, Graph, URIRef
+from acdh_graph_pyutils.xml import parse_xml
+
+
+def file_hash(
+    file: str,
+    chunk_size: int = 1 << 20,
+) -> str:
+    """
+    Returns the sha256 hex digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(
+    manifest_file: str,
+) -> dict:
+    """
+    Returns the build manifest {file: {"hash": ..., "context": ...}}
+    or an empty dict if manifest_file does not exist.
+    """
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(
+    manifest: dict,
+    manifest_file: str,
+) -> None:
+    """
+    Writes the build manifest to manifest_file.
+    """
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+
+def build_graph_incremental(
+    xml_files: Iterable[str],
+    mapping: Callable[[Graph, Element], object],
+    graph: ConjunctiveGraph,
+    manifest_file: str,
+) -> dict[str, list[str]]:
+    """
+    Builds one named graph per xml file in graph by calling mapping(context, root).
+    Only files whose content hash differs from the one recorded in manifest_file are
+    parsed again; their previous named graph is removed before the mapping runs.
+    Named graphs of files no longer listed are removed as well.
+    graph should use a persistent store (e.g. create_disk_store) to be reused between runs.
+    Returns a dict with the 'changed', 'unchanged' and 'removed' files.
+    """
+    manifest = load_manifest(manifest_file)
+    result = {"changed": [], "unchanged": [], "removed": []}
+    xml_files = list(xml_files)
+    for file in xml_files:
+        digest = file_hash(file)
+        entry = manifest.get(file)
+        if entry is not None and entry["hash"] == digest:
+            result["unchanged"].append(file)
+            continue
+        context_uri = URIRef(entry["context"]) if entry else URIRef(Path(file).resolve().as_uri())
+        graph.remove_context(graph.get_context(context_uri))
+        mapping(graph.get_context(context_uri), parse_xml(file))
+        manifest[file] = {"hash": digest, "context": str(context_uri)}
+        result["changed"].append(file)
+    for file in sorted(set(manifest) - set(xml_files)):
+        graph.store.remove_graph(graph.get_context(URIRef(manifest.pop(file)["context"])))
+        result["removed"].append(file)
+    graph.commit()
+    save_manifest(manifest, manifest_file)
+    return result
@@ -0,0 +1,202 @@
+import functools
+import sys
+from collections import Counter
+from time import perf_counter
+from typing import Callable, Iterable
+
+
+_stats = None
+_caches = {}
+# instrumented function -> recording wrapper
+_wrappers = {}
+# modules outside the package the wrappers are bound on
+_modules = ()
+
+
+class Stats:
+    """
+    Call counts and cumulative time (seconds) per helper, triples added per predicate
+    and hits/misses of the registered caches since instrumentation was enabled.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str, float], object] = None,
+    ) -> None:
+        self.callback = callback
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.triples = Counter()
+        self._cache_baseline = {name: _cache_counts(source) for name, source in _caches.items()}
+
+    def record(
+        self,
+        name: str,
+        seconds: float,
+    ) -> None:
+        self.calls[name] += 1
+        self.seconds[name] += seconds
+        if self.callback is not None:
+            self.callback(name, seconds)
+
+    def caches(self) -> dict[str, dict]:
+        """
+        Returns {cache name: {"hits": ..., "misses": ..., "hit_rate": ...}}.
+        """
+        result = {}
+        for name, source in _caches.items():
+            hits, misses = _cache_counts(source)
+            base_hits, base_misses = self._cache_baseline.get(name, (0, 0))
+            hits, misses = hits - base_hits, misses - base_misses
+            result[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+            }
+        return result
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "seconds": dict(self.seconds),
+            "triples": {str(key): value for key, value in self.triples.items()},
+            "caches": self.caches(),
+        }
+
+    def report(self) -> str:
+        """
+        Returns the stats as text table, slowest helpers first.
+        """
+        lines = [f"{'helper':<50} {'calls':>10} {'seconds':>10}"]
+        for name, seconds in self.seconds.most_common():
+            lines.append(f"{name:<50} {self.calls[name]:>10} {seconds:>10.3f}")
+        lines.append(f"{'predicate':<61} {'triples':>10}")
+        for predicate, count in self.triples.most_common():
+            lines.append(f"{str(predicate):<61} {count:>10}")
+        lines.append(f"{'cache':<50} {'hits':>10} {'misses':>10}")
+        for name, cache in self.caches().items():
+            lines.append(f"{name:<50} {cache['hits']:>10} {cache['misses']:>10}")
+        return "\n".join(lines)
+
+
+def _cache_counts(
+    source,
+) -> tuple[int, int]:
+    info = source.cache_info() if hasattr(source, "cache_info") else source
+    return info.hits, info.misses
+
+
+def register_cache(
+    name: str,
+    source,
+) -> None:
+    """
+    Registers a cache for the hit/miss stats; source is a functools.lru_cache
+    function or an object with hits and misses attributes (e.g. a URIInterner).
+    """
+    _caches[name] = source
+    if _stats is not None:
+        _stats._cache_baseline[name] = _cache_counts(source)
+
+
+def _swap_functions(
+    replacements: dict,
+    modules: Iterable[str],
+) -> None:
+    # rebinds the functions on the package modules and the given modules, including names
+    # imported with 'from ... import'; values are matched by identity, so no foreign __hash__ runs
+    by_id = {id(func): (func, replacement) for func, replacement in replacements.items()}
+    for name, module in list(sys.modules.items()):
+        if not (name == __package__ or name.startswith(f"{__package__}.") or name in modules):
+            continue
+        namespace = getattr(module, "__dict__", None)
+        if namespace is None:
+            continue
+        for key, value in list(namespace.items()):
+            found = by_id.get(id(value))
+            if found is not None and found[0] is value:
+                namespace[key] = found[1]
+
+
+def enable_instrumentation(
+    callback: Callable[[str, float], object] = None,
+    modules: Iterable[str] = (),
+) -> Stats:
+    """
+    Starts recording the helper stats and returns the new Stats object.
+    callback(name, seconds) is called after each instrumented helper call.
+    The recording wrappers are bound in place of the helpers on the acdh_graph_pyutils modules
+    and on the modules named in modules (e.g. ["__main__"]) that import helpers by name;
+    other references to a helper (e.g. in local variables) are not recorded.
+    """
+    global _stats, _modules
+    if _stats is not None:
+        _swap_functions({wrapper: func for func, wrapper in _wrappers.items()}, _modules)
+    _modules = tuple(modules)
+    _swap_functions(_wrappers, _modules)
+    _stats = Stats(callback=callback)
+    return _stats
+
+
+def disable_instrumentation() -> Stats | None:
+    """
+    Stops recording, binds the plain helpers again and returns the recorded Stats object.
+    """
+    global _stats
+    stats, _stats = _stats, None
+    if stats is not None:
+        _swap_functions({wrapper: func for func, wrapper in _wrappers.items()}, _modules)
+    return stats
+
+
+def get_stats() -> Stats | None:
+    """
+    Returns the current Stats object or None if instrumentation is disabled.
+    """
+    return _stats
+
+
+def count_triples(
+    predicate,
+    count: int = 1,
+) -> None:
+    """
+    Counts triples added for predicate if instrumentation is enabled.
+    """
+    if _stats is not None:
+        _stats.triples[predicate] += count
+
+
+def count_triples_of(
+    triples: list[tuple],
+) -> None:
+    """
+    Counts triples added per predicate of (subject, predicate, object) triples if instrumentation is enabled.
+    """
+    if _stats is not None:
+        _stats.triples.update(p for _, p, _ in triples)
+
+
+def instrumented(
+    func: Callable,
+) -> Callable:
+    """
+    Decorator registering func for instrumentation. func is returned unchanged, so it costs
+    nothing while instrumentation is disabled; enable_instrumentation() binds a wrapper
+    recording its call count and time in its place.
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _stats
+        if stats is None:
+            return func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.record(name, perf_counter() - start)
+    _wrappers[func] = wrapper
+    # modules imported while instrumentation is enabled get the wrapper right away
+    return wrapper if _stats is not None else func
@@ -0,0 +1,264 @@
+import json
+from typing import Iterator
+from lxml.etree import Element
+from lxml import etree as ET
+from rdflib import Graph, URIRef
+from rdflib.namespace import OWL, RDF, RDFS, XSD
+from acdh_graph_pyutils.graph import TripleBuffer, create_empty_graph, create_memory_store
+from acdh_graph_pyutils.namespaces import NAMESPACES, NSMAP
+from acdh_graph_pyutils.string_utils import cached_date_to_literal
+from acdh_graph_pyutils.xml import (
+    DATE_ATTRIBUTE_DICT,
+    URIInterner,
+    create_literal,
+    create_literal_from_coordinates,
+    create_uri_from_node_tag,
+    extract_begin_end,
+)
+
+
+PREDICATE_NAMESPACES = {
+    "rdf": RDF,
+    "rdfs": RDFS,
+    "owl": OWL,
+    "xsd": XSD,
+    **NAMESPACES,
+}
+
+FIELD_KINDS = ("literal", "date", "coordinates", "uri")
+
+
+def resolve_curie(
+    curie: str,
+    namespaces: dict = PREDICATE_NAMESPACES,
+) -> URIRef:
+    """
+    Returns the URIRef of a 'prefix:local' name or of a full URI.
+    """
+    if curie.startswith("<") and curie.endswith(">"):
+        return URIRef(curie[1:-1])
+    prefix, _, local = curie.partition(":")
+    if prefix in namespaces:
+        return URIRef(f"{namespaces[prefix]}{local}")
+    if local.startswith("//"):
+        return URIRef(curie)
+    raise ValueError(f"Unknown namespace prefix in '{curie}'.")
+
+
+def resolve_qname(
+    qname: str,
+    nsmap: dict = NSMAP,
+) -> str:
+    """
+    Returns the Clark notation ('{namespace}local') of a 'prefix:local' XML name.
+    Names without prefix are returned unchanged.
+    """
+    if qname.startswith("{") or ":" not in qname:
+        return qname
+    prefix, local = qname.split(":", 1)
+    if prefix not in nsmap:
+        raise ValueError(f"Unknown XML namespace prefix in '{qname}'.")
+    return f"{{{nsmap[prefix]}}}{local}"
+
+
+def load_mapping(
+    path: str,
+) -> dict:
+    """
+    Returns a mapping spec loaded from a JSON or YAML (requires PyYAML) file.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class _PathNode:
+    """
+    One step of the field paths of an entity: the fields emitted for an element
+    reached by this path and the next steps by child tag.
+    """
+
+    def __init__(self) -> None:
+        self.fields = []
+        self.children = {}
+
+
+class _Field:
+
+    def __init__(
+        self,
+        spec: dict,
+        namespaces: dict,
+        nsmap: dict,
+    ) -> None:
+        self.kind = spec.get("kind", "literal")
+        if self.kind not in FIELD_KINDS:
+            raise ValueError(f"Unknown field kind '{self.kind}'.")
+        self.where = {resolve_qname(key, nsmap): value for key, value in spec.get("where", {}).items()}
+        if self.kind == "date":
+            self.begin = resolve_curie(spec["begin"], namespaces) if spec.get("begin") else None
+            self.end = resolve_curie(spec["end"], namespaces) if spec.get("end") else None
+            self.fill_missing = spec.get("fill_missing", True)
+            self.attribute_map = spec.get("attribute_map", DATE_ATTRIBUTE_DICT)
+        else:
+            self.predicate = resolve_curie(spec["predicate"], namespaces)
+        self.prefix = spec.get("prefix", "")
+        self.lang = spec.get("lang", False)
+        self.enforce_lang = spec.get("enforce_lang", False)
+        self.attribute = resolve_qname(spec["attribute"], nsmap) if spec.get("attribute") else None
+        self.split_char = spec.get("split_char", " ")
+
+    def triples(
+        self,
+        subject: URIRef,
+        node: Element,
+    ) -> Iterator[tuple]:
+        for key, value in self.where.items():
+            if node.get(key) != value:
+                return
+        if self.kind == "literal":
+            yield subject, self.predicate, create_literal(node, self.prefix, self.lang, self.enforce_lang)
+        elif self.kind == "date":
+            begin, end = extract_begin_end(node, self.fill_missing, self.attribute_map)
+            if self.begin is not None and begin:
+                yield subject, self.begin, cached_date_to_literal(begin)
+            if self.end is not None and end:
+                yield subject, self.end, cached_date_to_literal(end)
+        elif self.kind == "coordinates":
+            if node.text:
+                yield subject, self.predicate, create_literal_from_coordinates(node, split_char=self.split_char)
+        else:
+            value = node.get(self.attribute) if self.attribute else node.text
+            if value and value.strip():
+                yield subject, self.predicate, URIRef(value.strip())
+
+
+class _Entity:
+
+    def __init__(
+        self,
+        spec: dict,
+        namespaces: dict,
+        nsmap: dict,
+    ) -> None:
+        uri = spec.get("uri", {})
+        self.prefix = uri["prefix"]
+        self.attribute = resolve_qname(uri.get("attribute", "xml:id"), nsmap)
+        types = spec.get("type", [])
+        self.types = [resolve_curie(x, namespaces) for x in ([types] if isinstance(types, str) else types)]
+        self.self_fields = []
+        self.paths = _PathNode()
+        for field in spec.get("fields", []):
+            compiled = _Field(field, namespaces, nsmap)
+            path = field.get("path", ".")
+            if path == ".":
+                self.self_fields.append(compiled)
+                continue
+            step = self.paths
+            for tag in path.split("/"):
+                step = step.children.setdefault(resolve_qname(tag, nsmap), _PathNode())
+            step.fields.append(compiled)
+
+
+class MappingPlan:
+    """
+    A compiled mapping spec. The XML tree is walked once: each element is
+    dispatched by its tag to the entity specs and to the field paths of all
+    enclosing entities, so no per-field XPath queries are needed.
+    """
+
+    def __init__(
+        self,
+        spec: dict,
+        namespaces: dict = PREDICATE_NAMESPACES,
+        nsmap: dict = NSMAP,
+        interner: URIInterner = None,
+    ) -> None:
+        self.interner = interner
+        self.entities = {}
+        for entity in spec["entities"]:
+            self.entities[resolve_qname(entity["tag"], nsmap)] = _Entity(entity, namespaces, nsmap)
+
+    def triples(
+        self,
+        root: Element,
+    ) -> Iterator[tuple]:
+        """
+        Yields the triples of all mapped entities in root.
+        """
+        entities = self.entities
+        # open paths (subject, path node) per ancestor of the current element
+        stack = []
+        for event, node in ET.iterwalk(root, events=("start", "end")):
+            if event == "end":
+                stack.pop()
+                continue
+            tag = node.tag
+            states = []
+            if stack:
+                for subject, step in stack[-1]:
+                    child = step.children.get(tag)
+                    if child is not None:
+                        for field in child.fields:
+                            yield from field.triples(subject, node)
+                        if child.children:
+                            states.append((subject, child))
+            entity = entities.get(tag)
+            if entity is not None:
+                subject = create_uri_from_node_tag(
+                    node, entity.prefix, attribute=entity.attribute, interner=self.interner
+                )
+                for rdf_type in entity.types:
+                    yield subject, RDF.type, rdf_type
+                for field in entity.self_fields:
+                    yield from field.triples(subject, node)
+                if entity.paths.children:
+                    states.append((subject, entity.paths))
+            stack.append(states)
+
+    def run(
+        self,
+        root: Element,
+        graph: Graph = None,
+        batch_size: int = 10000,
+    ) -> Graph:
+        """
+        Adds the triples of all mapped entities in root to graph
+        (a new graph from create_empty_graph if not provided) and returns it.
+        """
+        if graph is None:
+            graph = create_empty_graph(store=create_memory_store())
+        with TripleBuffer(graph, batch_size=batch_size) as buffer:
+            for triple in self.triples(root):
+                buffer.add(*triple)
+        return graph
+
+
+def compile_mapping(
+    spec: dict,
+    namespaces: dict = PREDICATE_NAMESPACES,
+    nsmap: dict = NSMAP,
+    interner: URIInterner = None,
+) -> MappingPlan:
+    """
+    Compiles a declarative mapping spec into a MappingPlan, e.g.
+
+    {"entities": [{
+        "tag": "tei:person",
+        "uri": {"prefix": "https://example.org/", "attribute": "xml:id"},
+        "type": "cidoc:E21_Person",
+        "fields": [
+            {"path": "tei:persName", "predicate": "rdfs:label", "lang": "en", "where": {"type": "full"}},
+            {"path": "tei:birth", "kind": "date", "begin": "cidoc:P82a_begin_of_the_begin"},
+            {"path": "tei:idno", "kind": "uri", "predicate": "owl:sameAs"},
+        ],
+    }]}
+
+    Entity and field paths use XML names with the NSMAP prefixes ('.' is the entity itself),
+    predicates and types 'prefix:local' names with the NAMESPACES (and rdf, rdfs, owl, xsd) prefixes.
+    Field kinds are 'literal' (create_literal), 'date' (extract_begin_end, begin/end predicates),
+    'coordinates' (create_literal_from_coordinates) and 'uri' (text or attribute as URIRef).
+    """
+    return MappingPlan(spec, namespaces=namespaces, nsmap=nsmap, interner=interner)
@@ -0,0 +1,203 @@
+import gzip
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Iterable
+from lxml.etree import Element
+from rdflib import Graph, Literal
+from acdh_graph_pyutils.graph import _ContextSink, create_empty_graph, create_memory_store
+from acdh_graph_pyutils.incremental import save_manifest
+from acdh_graph_pyutils.xml import (
+    extract_root_nsmap,
+    find_element_ranges,
+    parse_xml,
+    parse_xml_fragments,
+)
+
+
+def _build_file_graph(
+    mapping: Callable[[Graph, Element], object],
+    xml_file: str,
+) -> bytes:
+    graph = Graph()
+    mapping(graph, parse_xml(xml_file))
+    return graph.serialize(format="nt", encoding="utf-8")
+
+
+def _merge_ntriples(
+    graph: Graph,
+    data: bytes,
+    batch_size: int = 10000,
+) -> None:
+    # batched addN into the default context, like a serial mapping(graph, root) adds to
+    from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+    sink = _ContextSink(graph, getattr(graph, "default_context", graph), batch_size)
+    W3CNTriplesParser(sink).parsestring(data, bnode_context={})
+    sink.flush()
+
+
+def build_graph_parallel(
+    xml_files: Iterable[str],
+    mapping: Callable[[Graph, Element], object],
+    graph: Graph = None,
+    max_workers: int = None,
+    chunksize: int = 1,
+) -> Graph:
+    """
+    Parses xml_files in a process pool and calls mapping(graph, root) on each
+    parsed file in the worker. mapping must be picklable (a module level function).
+    The per-file graphs are sent back as N-Triples and merged, in input order,
+    into graph (a new graph from create_empty_graph if not provided).
+    Returns the merged rdflib Graph object.
+    """
+    if graph is None:
+        graph = create_empty_graph(store=create_memory_store())
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for data in executor.map(partial(_build_file_graph, mapping), xml_files, chunksize=chunksize):
+            _merge_ntriples(graph, data)
+    return graph
+
+
+def _build_fragment_graph(
+    mapping: Callable[[Graph, Element], object],
+    xml_file: str,
+    nsmap: dict,
+    ranges: list[tuple[int, int]],
+) -> bytes:
+    graph = Graph()
+    mapping(graph, parse_xml_fragments(xml_file, ranges, nsmap))
+    return graph.serialize(format="nt", encoding="utf-8")
+
+
+def build_graph_parallel_split(
+    xml_file: str,
+    tag: str,
+    mapping: Callable[[Graph, Element], object],
+    graph: Graph = None,
+    max_workers: int = None,
+    batch_size: int = 1000,
+) -> Graph:
+    """
+    Splits one large XML file at the byte ranges of its outermost tag elements
+    (see find_element_ranges, e.g. tag='person' for a TEI listPerson) and parses them
+    in a process pool, batch_size elements per task. Each worker memory maps the file,
+    parses its elements as a fragment with the root namespace map re-injected and calls
+    mapping(graph, fragment) (see parse_xml_fragments); mapping must be picklable.
+    Namespaces declared below the root and content outside the tag elements are not seen by mapping.
+    The graphs are merged, in document order, into graph
+    (a new graph from create_empty_graph if not provided).
+    Returns the merged rdflib Graph object.
+    """
+    if graph is None:
+        graph = create_empty_graph(store=create_memory_store())
+    ranges = find_element_ranges(xml_file, tag)
+    batches = [ranges[x:x + batch_size] for x in range(0, len(ranges), batch_size)]
+    build = partial(_build_fragment_graph, mapping, xml_file, extract_root_nsmap(xml_file))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for data in executor.map(build, batches):
+            _merge_ntriples(graph, data)
+    return graph
+
+
+def _plain_term(term) -> str | tuple:
+    # plain strings pickle and unpickle much faster than rdflib terms;
+    # IRIs are rendered (and validated) by n3(), like stream_serialize_graph does
+    if isinstance(term, Literal):
+        return (str(term), term.language, term.datatype.n3() if term.datatype else None)
+    return term.n3()
+
+
+def _nt_term(term: str | tuple) -> str:
+    from rdflib.plugins.serializers.nt import _quote_encode
+    if type(term) is str:
+        return term
+    value, language, datatype = term
+    if language:
+        return f"{_quote_encode(value)}@{language}"
+    if datatype:
+        return f"{_quote_encode(value)}^^{datatype}"
+    return _quote_encode(value)
+
+
+def _serialize_shard_chunk(
+    compress: bool,
+    triples: list[tuple],
+) -> bytes:
+    data = "".join(f"{_nt_term(s)} {_nt_term(p)} {_nt_term(o)} .\n" for s, p, o in triples).encode("utf-8")
+    return gzip.compress(data, mtime=0) if compress else data
+
+
+def shard_of(
+    subject,
+    shards: int,
+) -> int:
+    """
+    Returns the shard index (0 based) of a subject, stable across processes and runs.
+    """
+    return zlib.crc32(str(subject).encode("utf-8")) % shards
+
+
+def export_graph_sharded(
+    graph: Graph,
+    directory: str,
+    shards: int = 8,
+    name: str = "graph",
+    compress: bool = True,
+    max_workers: int = None,
+    chunk_size: int = 50000,
+    manifest_file: str = "manifest.json",
+) -> dict:
+    """
+    Writes graph as N-Triples into shards files ({name}-00001.nt.gz, ...) in directory,
+    partitioned by subject hash, so all triples of a subject end up in the same shard.
+    Chunks of chunk_size triples are sent as plain strings to a process pool,
+    serialized and gzip compressed there and appended to their shard file in order;
+    the gzip members of a shard file form one valid gzip stream.
+    IRIs are validated like in stream_serialize_graph, an invalid one raises.
+    Writes and returns the manifest {"format": "nt", "triples": ..., "shards": [{"file": ..., "triples": ...}]}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    extension = "nt.gz" if compress else "nt"
+    files = [f"{name}-{index + 1:05d}.{extension}" for index in range(shards)]
+    counts = [0] * shards
+    buffers = [[] for _ in range(shards)]
+    streams = [open(os.path.join(directory, file), "wb") for file in files]
+    # bounded number of chunks in flight, written in submission order
+    pending = deque()
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        serialize = partial(_serialize_shard_chunk, compress)
+
+        def submit(index: int) -> None:
+            pending.append((index, executor.submit(serialize, buffers[index])))
+            counts[index] += len(buffers[index])
+            buffers[index] = []
+            while len(pending) > max_pending:
+                write(*pending.popleft())
+
+        def write(index: int, future) -> None:
+            streams[index].write(future.result())
+
+        try:
+            for s, p, o in graph:
+                index = shard_of(s, shards)
+                buffers[index].append((_plain_term(s), _plain_term(p), _plain_term(o)))
+                if len(buffers[index]) >= chunk_size:
+                    submit(index)
+            for index in range(shards):
+                if buffers[index]:
+                    submit(index)
+            while pending:
+                write(*pending.popleft())
+        finally:
+            for stream in streams:
+                stream.close()
+    manifest = {
+        "format": "nt",
+        "triples": sum(counts),
+        "shards": [{"file": file, "triples": count} for file, count in zip(files, counts)],
+    }
+    save_manifest(manifest, os.path.join(directory, manifest_file))
+    return manifest
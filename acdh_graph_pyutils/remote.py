@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable
+from urllib.request import urlopen
+from lxml.etree import Element
+from acdh_graph_pyutils.xml import parse_xml_bytes
+
+
+def fetch_xml_bytes(
+    url: str,
+    timeout: float = 60.0,
+) -> bytes:
+    """
+    Returns the body of a HTTP(S) response as bytes.
+    """
+    with urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+async def iter_remote_xml(
+    urls: Iterable[str],
+    max_concurrency: int = 8,
+    timeout: float = 60.0,
+) -> AsyncIterator[tuple[str, Element]]:
+    """
+    Downloads and parses the XML documents at urls concurrently.
+    At most max_concurrency documents are downloaded, parsed, waiting to be
+    consumed or held by the consumer (the last yielded one) at the same time.
+    Downloading and parsing (with huge_tree enabled, like parse_xml) run in a thread pool.
+    Yields (url, root element) tuples in the order the documents finish;
+    the first failing download or parse raises.
+    """
+    loop = asyncio.get_running_loop()
+    # a slot is taken before a download and freed once the consumer asks for the next document
+    slots = asyncio.Semaphore(max_concurrency)
+    queue = asyncio.Queue()
+    urls = iter(urls)
+    finished = object()
+
+    async def worker(executor: ThreadPoolExecutor) -> None:
+        for url in urls:
+            await slots.acquire()
+            try:
+                data = await loop.run_in_executor(executor, fetch_xml_bytes, url, timeout)
+                root = await loop.run_in_executor(executor, parse_xml_bytes, data)
+            except Exception as e:
+                queue.put_nowait((url, e))
+                return
+            queue.put_nowait((url, root))
+        queue.put_nowait(finished)
+
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    workers = [asyncio.create_task(worker(executor)) for _ in range(max_concurrency)]
+    try:
+        running = len(workers)
+        while running:
+            item = await queue.get()
+            if item is finished:
+                running -= 1
+                continue
+            url, result = item
+            if isinstance(result, Exception):
+                raise result
+            yield url, result
+            slots.release()
+    finally:
+        for x in workers:
+            x.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # running downloads are not waited for, so closing never blocks the event loop
+        executor.shutdown(wait=False, cancel_futures=True)
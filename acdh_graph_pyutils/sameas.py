@@ -0,0 +1,167 @@
+from typing import Iterable, Iterator
+from rdflib import Graph, URIRef
+from rdflib.namespace import OWL
+from acdh_graph_pyutils.graph import create_empty_graph, create_memory_store
+
+
+class SameAsIndex:
+    """
+    An incremental union-find index of owl:sameAs equivalence clusters.
+    Terms are encoded to integer ids; lookups use path halving and union by size,
+    so canonical() and cluster() answer in near-constant time (cluster() in its size).
+    The canonical representative of a cluster is its first added term,
+    usually the own entity URI of the first create_sameAs_triple call.
+    """
+
+    def __init__(self) -> None:
+        self._ids = {}
+        self._terms = []
+        self._parent = []
+        self._members = []
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: URIRef) -> bool:
+        return term in self._ids
+
+    def _id(self, term: URIRef) -> int:
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+            self._parent.append(term_id)
+            self._members.append([term_id])
+        return term_id
+
+    def _find(self, term_id: int) -> int:
+        parent = self._parent
+        while parent[term_id] != term_id:
+            parent[term_id] = parent[parent[term_id]]
+            term_id = parent[term_id]
+        return term_id
+
+    def add(
+        self,
+        subject: URIRef,
+        object: URIRef,
+    ) -> "SameAsIndex":
+        """
+        Adds a subject owl:sameAs object link, merging both clusters.
+        """
+        a = self._find(self._id(subject))
+        b = self._find(self._id(object))
+        if a == b:
+            return self
+        members = self._members
+        if len(members[a]) < len(members[b]):
+            a, b = b, a
+        self._parent[b] = a
+        # each member list keeps its first added term (smallest id) in front
+        if members[b][0] < members[a][0]:
+            members[a][0], members[b][0] = members[b][0], members[a][0]
+        members[a].extend(members[b])
+        members[b] = None
+        return self
+
+    def add_triples(
+        self,
+        triples: Iterable[tuple],
+    ) -> "SameAsIndex":
+        """
+        Adds the owl:sameAs links of (subject, predicate, object) triples, other triples are skipped.
+        """
+        for s, p, o in triples:
+            if p == OWL.sameAs:
+                self.add(s, o)
+        return self
+
+    @classmethod
+    def from_graph(
+        cls,
+        graph: Graph,
+    ) -> "SameAsIndex":
+        """
+        Returns a SameAsIndex of all owl:sameAs triples of graph.
+        """
+        index = cls()
+        for s, o in graph.subject_objects(OWL.sameAs):
+            index.add(s, o)
+        return index
+
+    def canonical(
+        self,
+        term: URIRef,
+    ) -> URIRef:
+        """
+        Returns the canonical representative of the cluster of term
+        (term itself if it has no sameAs links).
+        """
+        term_id = self._ids.get(term)
+        if term_id is None:
+            return term
+        return self._terms[self._members[self._find(term_id)][0]]
+
+    def cluster(
+        self,
+        term: URIRef,
+    ) -> list[URIRef]:
+        """
+        Returns all terms of the cluster of term, canonical representative first.
+        """
+        term_id = self._ids.get(term)
+        if term_id is None:
+            return [term]
+        return [self._terms[x] for x in self._members[self._find(term_id)]]
+
+    def clusters(self) -> Iterator[list[URIRef]]:
+        """
+        Yields all clusters, canonical representative first.
+        """
+        terms = self._terms
+        for members in self._members:
+            if members is not None:
+                yield [terms[x] for x in members]
+
+    def closure(
+        self,
+        reflexive: bool = False,
+    ) -> Iterator[tuple]:
+        """
+        Yields the owl:sameAs triples of the symmetric and transitive closure
+        of all clusters (and term owl:sameAs term if reflexive is set).
+        """
+        for cluster in self.clusters():
+            for a in cluster:
+                for b in cluster:
+                    if reflexive or a != b:
+                        yield a, OWL.sameAs, b
+
+    def smush(
+        self,
+        graph: Graph,
+        target: Graph = None,
+        keep_sameAs: bool = True,
+    ) -> Graph:
+        """
+        Returns a copy of graph (into target, a new graph from create_empty_graph if not provided)
+        with every subject and object replaced by its canonical representative.
+        If keep_sameAs is set, each cluster is linked once by canonical owl:sameAs term triples,
+        otherwise all owl:sameAs triples are dropped.
+        """
+        if target is None:
+            target = create_empty_graph(store=create_memory_store())
+        canonical = self.canonical
+        context = getattr(target, "default_context", target)
+        target.addN(
+            (canonical(s), p, canonical(o), context)
+            for s, p, o in graph
+            if p != OWL.sameAs
+        )
+        if keep_sameAs:
+            target.addN(
+                (cluster[0], OWL.sameAs, term, context)
+                for cluster in self.clusters()
+                for term in cluster[1:]
+            )
+        return target
@@ -0,0 +1,278 @@
+import sqlite3
+from typing import Iterable, Iterator
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import Store, VALID_STORE, NO_STORE
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS terms (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        datatype TEXT NOT NULL,
+        UNIQUE (kind, value, lang, datatype)
+    )""",
+    """CREATE TABLE IF NOT EXISTS quads (
+        s INTEGER NOT NULL,
+        p INTEGER NOT NULL,
+        o INTEGER NOT NULL,
+        c INTEGER NOT NULL,
+        PRIMARY KEY (s, p, o, c)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s)",
+    "CREATE INDEX IF NOT EXISTS quads_osp ON quads (o, s, p)",
+    "CREATE INDEX IF NOT EXISTS quads_c ON quads (c)",
+    "CREATE TABLE IF NOT EXISTS contexts (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT NOT NULL UNIQUE)",
+]
+
+
+def _term_key(term) -> tuple[str, str, str, str]:
+    if isinstance(term, Literal):
+        return ("L", str(term), term.language or "", term.datatype or "")
+    if isinstance(term, BNode):
+        return ("B", str(term), "", "")
+    if isinstance(term, URIRef):
+        return ("U", str(term), "", "")
+    raise TypeError(f"Cannot store term of type {type(term).__name__}.")
+
+
+def _key_term(kind: str, value: str, lang: str, datatype: str):
+    if kind == "U":
+        return URIRef(value)
+    if kind == "B":
+        return BNode(value)
+    return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+
+
+class SQLiteStore(Store):
+    """
+    A context aware rdflib Store persisted in a SQLite database file.
+    Terms are dictionary encoded to integer ids; quads are indexed by spoc, posc and ospc.
+    Changes are written on commit() and close().
+
+    configuration: path of the database file
+    cache_size: SQLite page cache size in KiB
+    term_cache_size: number of terms kept in the in-memory term/id caches
+    bulk_load: disables SQLite journaling and fsync, for fast (re)builds of a store
+    """
+    context_aware = True
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = True
+
+    def __init__(
+        self,
+        configuration: str = None,
+        identifier: URIRef = None,
+        cache_size: int = 65536,
+        term_cache_size: int = 1000000,
+        bulk_load: bool = False,
+    ) -> None:
+        self.identifier = identifier
+        self.cache_size = cache_size
+        self.term_cache_size = term_cache_size
+        self.bulk_load = bulk_load
+        self._conn = None
+        self._ids = {}
+        self._terms = {}
+        # context ids known to be in the contexts table
+        self._contexts = set()
+        super().__init__(configuration)
+
+    # Database management methods
+    def open(self, configuration: str, create: bool = False) -> int:
+        self._conn = sqlite3.connect(configuration)
+        if not create:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quads'"
+            ).fetchone()
+            if exists is None:
+                self._conn.close()
+                self._conn = None
+                return NO_STORE
+        self._conn.execute(f"PRAGMA cache_size = {-int(self.cache_size)}")
+        if self.bulk_load:
+            self._conn.execute("PRAGMA journal_mode = OFF")
+            self._conn.execute("PRAGMA synchronous = OFF")
+        else:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = True) -> None:
+        if self._conn is not None:
+            if commit_pending_transaction:
+                self._conn.commit()
+            self._conn.close()
+            self._conn = None
+            self._contexts.clear()
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+        self._ids.clear()
+        self._terms.clear()
+        self._contexts.clear()
+
+    # term encoding
+    def _cache(self, key: tuple, term_id: int) -> None:
+        if len(self._ids) >= self.term_cache_size:
+            self._ids.clear()
+            self._terms.clear()
+        self._ids[key] = term_id
+        self._terms[term_id] = key
+
+    def _term_id(self, term, create: bool = False) -> int | None:
+        key = _term_key(term)
+        term_id = self._ids.get(key)
+        if term_id is None:
+            row = self._conn.execute(
+                "SELECT id FROM terms WHERE kind = ? AND value = ? AND lang = ? AND datatype = ?", key
+            ).fetchone()
+            if row is not None:
+                term_id = row[0]
+            elif create:
+                term_id = self._conn.execute(
+                    "INSERT INTO terms (kind, value, lang, datatype) VALUES (?, ?, ?, ?)", key
+                ).lastrowid
+            else:
+                return None
+            self._cache(key, term_id)
+        return term_id
+
+    def _term(self, term_id: int):
+        key = self._terms.get(term_id)
+        if key is None:
+            key = self._conn.execute(
+                "SELECT kind, value, lang, datatype FROM terms WHERE id = ?", (term_id,)
+            ).fetchone()
+            self._cache(key, term_id)
+        return _key_term(*key)
+
+    def _context_id(self, context, create: bool = False) -> int | None:
+        identifier = getattr(context, "identifier", context)
+        context_id = self._term_id(identifier, create=create)
+        if create and context_id not in self._contexts:
+            self._conn.execute("INSERT OR IGNORE INTO contexts (id) VALUES (?)", (context_id,))
+            self._contexts.add(context_id)
+        return context_id
+
+    def _context(self, context_id: int) -> Graph:
+        return Graph(store=self, identifier=self._term(context_id))
+
+    def _pattern(self, triple: tuple, context) -> tuple[str, list] | None:
+        clauses, params = [], []
+        for column, term in zip(("s", "p", "o"), triple):
+            if term is not None:
+                term_id = self._term_id(term)
+                if term_id is None:
+                    return None
+                clauses.append(f"{column} = ?")
+                params.append(term_id)
+        if context is not None:
+            context_id = self._context_id(context)
+            if context_id is None:
+                return None
+            clauses.append("c = ?")
+            params.append(context_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # RDF APIs
+    def add(self, triple: tuple, context: Graph, quoted: bool = False) -> None:
+        Store.add(self, triple, context, quoted)
+        s, p, o = triple
+        self._conn.execute(
+            "INSERT OR IGNORE INTO quads (s, p, o, c) VALUES (?, ?, ?, ?)",
+            (self._term_id(s, True), self._term_id(p, True), self._term_id(o, True),
+             self._context_id(context, True)),
+        )
+
+    def addN(self, quads: Iterable[tuple]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO quads (s, p, o, c) VALUES (?, ?, ?, ?)",
+            ((self._term_id(s, True), self._term_id(p, True), self._term_id(o, True),
+              self._context_id(c, True)) for s, p, o, c in quads),
+        )
+
+    def remove(self, triple: tuple, context: Graph = None) -> None:
+        Store.remove(self, triple, context)
+        pattern = self._pattern(triple, context)
+        if pattern is not None:
+            where, params = pattern
+            self._conn.execute(f"DELETE FROM quads{where}", params)
+
+    def triples(self, triple: tuple, context: Graph = None) -> Iterator[tuple]:
+        pattern = self._pattern(triple, context)
+        if pattern is None:
+            return
+        where, params = pattern
+        for s, p, o in self._conn.execute(f"SELECT DISTINCT s, p, o FROM quads{where}", params):
+            if context is not None:
+                contexts = iter([context])
+            else:
+                contexts = self._triple_contexts(s, p, o)
+            yield (self._term(s), self._term(p), self._term(o)), contexts
+
+    def _triple_contexts(self, s: int, p: int, o: int) -> Iterator[Graph]:
+        rows = self._conn.execute(
+            "SELECT c FROM quads WHERE s = ? AND p = ? AND o = ?", (s, p, o)
+        ).fetchall()
+        for (context_id,) in rows:
+            yield self._context(context_id)
+
+    def __len__(self, context: Graph = None) -> int:
+        if context is None:
+            return self._conn.execute("SELECT COUNT(*) FROM (SELECT DISTINCT s, p, o FROM quads)").fetchone()[0]
+        context_id = self._context_id(context)
+        if context_id is None:
+            return 0
+        return self._conn.execute("SELECT COUNT(*) FROM quads WHERE c = ?", (context_id,)).fetchone()[0]
+
+    def contexts(self, triple: tuple = None) -> Iterator[Graph]:
+        if triple is None or triple == (None, None, None):
+            rows = self._conn.execute("SELECT id FROM contexts").fetchall()
+        else:
+            pattern = self._pattern(triple, None)
+            if pattern is None:
+                return
+            where, params = pattern
+            rows = self._conn.execute(f"SELECT DISTINCT c FROM quads{where}", params).fetchall()
+        for (context_id,) in rows:
+            yield self._context(context_id)
+
+    def add_graph(self, graph: Graph) -> None:
+        self._context_id(graph, create=True)
+
+    def remove_graph(self, graph: Graph) -> None:
+        context_id = self._context_id(graph)
+        if context_id is not None:
+            self._conn.execute("DELETE FROM quads WHERE c = ?", (context_id,))
+            self._conn.execute("DELETE FROM contexts WHERE id = ?", (context_id,))
+            self._contexts.discard(context_id)
+
+    # namespace bindings
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True) -> None:
+        bound_namespace = self.namespace(prefix)
+        bound_prefix = self.prefix(namespace)
+        if not override and (bound_namespace is not None or bound_prefix is not None):
+            return
+        self._conn.execute("DELETE FROM namespaces WHERE prefix = ? OR uri = ?", (prefix, str(namespace)))
+        self._conn.execute("INSERT INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix: str) -> URIRef | None:
+        row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace: URIRef) -> str | None:
+        row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self) -> Iterator[tuple[str, URIRef]]:
+        for prefix, uri in self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
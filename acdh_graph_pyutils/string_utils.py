@@ -1,14 +1,76 @@
-from typing import Union
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Union
 from rdflib import Literal, XSD
+from acdh_graph_pyutils.instrumentation import instrumented, register_cache
 
 
-def normalize_string(string: str) -> str:
+STRING_CACHE_SIZE = 65536
+
+
+def normalize_string(
+    string: str,
+    nfc: bool = False,
+) -> str:
     """
     Returns a normalized string.
+    Whitespace runs are collapsed to single spaces, [optional] followed by
+    Unicode NFC normalization.
+    """
+    string = " ".join(string.split())
+    if nfc:
+        return unicodedata.normalize("NFC", string)
+    return string
+
+
+@instrumented
+def normalize_strings(
+    strings: Iterable[str],
+    nfc: bool = False,
+) -> list[str]:
     """
-    return " ".join(" ".join(string.split()).split())
+    Returns a list of normalized strings, see normalize_string.
+    """
+    if nfc:
+        return [unicodedata.normalize("NFC", " ".join(x.split())) for x in strings]
+    return [" ".join(x.split()) for x in strings]
+
+
+@lru_cache(maxsize=STRING_CACHE_SIZE)
+def _cached_normalize_string(
+    string: str,
+    nfc: bool,
+) -> str:
+    return normalize_string(string, nfc)
 
 
+def cached_normalize_string(
+    string: str,
+    nfc: bool = False,
+) -> str:
+    """
+    Returns a normalized string like normalize_string.
+    Results are cached (LRU), for highly repetitive text like TEI labels.
+    """
+    return _cached_normalize_string(string, nfc)
+
+
+register_cache("string_utils.cached_normalize_string", _cached_normalize_string)
+
+
+DATE_CACHE_SIZE = 65536
+
+DATE_LENGTH_DATATYPES = {
+    4: XSD.gYear,
+    7: XSD.gYearMonth,
+    10: XSD.date,
+    19: XSD.dateTime,
+    20: XSD.dateTime,
+    25: XSD.dateTime,
+}
+
+
+@instrumented
 def date_to_literal(
     date_str: Union[str, bool],
     not_known_value="undefined",
@@ -17,25 +79,53 @@ def date_to_literal(
     """"
     Returns a rdflib Literal object of a date datatype.
     """
-    if date_str is None:
-        return_value = Literal(not_known_value, lang=default_lang)
-    elif date_str == "":
-        return_value = Literal(not_known_value, lang=default_lang)
-    else:
-        if len(date_str) == 4:
-            return_value = Literal(date_str, datatype=XSD.gYear)
-        elif len(date_str) == 5 and date_str.startswith("-"):
-            return_value = Literal(date_str, datatype=XSD.gYear)
-        elif len(date_str) == 7:
-            return_value = Literal(date_str, datatype=XSD.gYearMonth)
-        elif len(date_str) == 10:
-            return_value = Literal(date_str, datatype=XSD.date)
-        elif len(date_str) == 19:
-            return_value = Literal(date_str, datatype=XSD.dateTime)
-        elif len(date_str) == 20:
-            return_value = Literal(date_str, datatype=XSD.dateTime)
-        elif len(date_str) == 25:
-            return_value = Literal(date_str, datatype=XSD.dateTime)
-        else:
-            return_value = Literal(date_str, datatype=XSD.string)
-    return return_value
+    if date_str is None or date_str == "":
+        return Literal(not_known_value, lang=default_lang)
+    if len(date_str) == 5 and date_str.startswith("-"):
+        return Literal(date_str, datatype=XSD.gYear)
+    return Literal(date_str, datatype=DATE_LENGTH_DATATYPES.get(len(date_str), XSD.string))
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _cached_date_to_literal(
+    date_str: Union[str, bool],
+    not_known_value: str,
+    default_lang: str,
+) -> Literal:
+    return date_to_literal(date_str, not_known_value, default_lang)
+
+
+def cached_date_to_literal(
+    date_str: Union[str, bool],
+    not_known_value="undefined",
+    default_lang="en"
+) -> Literal:
+    """
+    Returns a rdflib Literal object of a date datatype like date_to_literal.
+    Literals are cached (LRU) by (date_str, not_known_value, default_lang),
+    repeated date strings return the same Literal object.
+    """
+    return _cached_date_to_literal(date_str, not_known_value, default_lang)
+
+
+register_cache("string_utils.cached_date_to_literal", _cached_date_to_literal)
+
+
+@instrumented
+def dates_to_literals(
+    date_strs: Iterable[Union[str, bool]],
+    not_known_value="undefined",
+    default_lang="en"
+) -> list[Literal]:
+    """
+    Returns a list of rdflib Literal objects of a date datatype,
+    one for each date string. Literals of repeated date strings are reused.
+    """
+    literals = {}
+    result = []
+    for date_str in date_strs:
+        literal = literals.get(date_str)
+        if literal is None:
+            literal = literals[date_str] = date_to_literal(date_str, not_known_value, default_lang)
+        result.append(literal)
+    return result
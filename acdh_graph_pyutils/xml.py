@@ -1,9 +1,14 @@
+import math
+import mmap
+import re
 import uuid
-from typing import TypedDict, Union
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, TypedDict, Union
+from xml.sax.saxutils import quoteattr
 from lxml.etree import Element, XMLParser
 from lxml import etree as ET
 from rdflib import Literal, URIRef, Namespace
-from acdh_tei_pyutils.utils import make_entity_label
+from acdh_graph_pyutils.instrumentation import instrumented, register_cache
 from acdh_graph_pyutils.string_utils import normalize_string
 
 
@@ -13,6 +18,12 @@ Nsmap = TypedDict('Nsmap', {
     "key": str,
 })
 
+XPATH_CACHE_SIZE = 256
+
+TAG_CACHE_SIZE = 1024
+
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
 DATE_ATTRIBUTE_DICT = {
     "notBefore": "start",
     "notBefore-iso": "start",
@@ -27,24 +38,13 @@ DATE_ATTRIBUTE_DICT = {
 }
 
 
-def extract_begin_end(
-    node: Union[Element, dict],
-    fill_missing: bool = True,
-    attribute_map: dict = DATE_ATTRIBUTE_DICT,
+def _resolve_begin_end(
+    start: Union[str, None],
+    end: Union[str, None],
+    when: Union[str, None],
+    fill_missing: bool,
 ) -> tuple[Union[str, bool], Union[str, bool]]:
-    """
-    Returns a tuple of two strings (begin, end) from a date object.
-    """
     final_start, final_end = None, None
-    start, end, when = None, None, None
-    for key, value in attribute_map.items():
-        date_value = node.get(key)
-        if date_value and value == "start":
-            start = date_value
-        if date_value and value == "end":
-            end = date_value
-        if date_value and value == "when":
-            when = date_value
     if fill_missing:
         if start or end or when:
             if start and end:
@@ -71,6 +71,57 @@ def extract_begin_end(
     return final_start, final_end
 
 
+@instrumented
+def extract_begin_end(
+    node: Union[Element, dict],
+    fill_missing: bool = True,
+    attribute_map: dict = DATE_ATTRIBUTE_DICT,
+) -> tuple[Union[str, bool], Union[str, bool]]:
+    """
+    Returns a tuple of two strings (begin, end) from a date object.
+    """
+    start, end, when = None, None, None
+    for key, value in attribute_map.items():
+        date_value = node.get(key)
+        if date_value and value == "start":
+            start = date_value
+        if date_value and value == "end":
+            end = date_value
+        if date_value and value == "when":
+            when = date_value
+    return _resolve_begin_end(start, end, when, fill_missing)
+
+
+@instrumented
+def extract_begin_end_many(
+    nodes: Iterable[Union[Element, dict]],
+    fill_missing: bool = True,
+    attribute_map: dict = DATE_ATTRIBUTE_DICT,
+) -> list[tuple[Union[str, bool], Union[str, bool]]]:
+    """
+    Returns a list of (begin, end) tuples, one for each node,
+    with the same results as extract_begin_end.
+    """
+    # attribute -> (role, position); on conflicts the attribute listed last wins
+    index = {key: (role, pos) for pos, (key, role) in enumerate(attribute_map.items())}
+    result = []
+    for node in nodes:
+        found = {}
+        for key, date_value in node.items():
+            entry = index.get(key)
+            if entry is not None and date_value:
+                role, pos = entry
+                if role not in found or pos > found[role][0]:
+                    found[role] = (pos, date_value)
+        if not found:
+            result.append((None, None))
+            continue
+        start, end, when = (found[x][1] if x in found else None for x in ("start", "end", "when"))
+        result.append(_resolve_begin_end(start, end, when, fill_missing))
+    return result
+
+
+@instrumented
 def parse_xml(
     xml_file: str
 ) -> Element:
@@ -81,6 +132,131 @@ def parse_xml(
     return ET.parse(xml_file, parser=p).getroot()
 
 
+@instrumented
+def parse_xml_bytes(
+    data: bytes
+) -> Element:
+    """
+    Returns the root lxml.etree.Element of an XML document given as bytes.
+    """
+    p = XMLParser(huge_tree=True)
+    return ET.fromstring(data, parser=p)
+
+
+def iterparse_xml(
+    xml_file: str,
+    tag: Union[str, list[str]],
+    mapping: Callable[[Element], object] = None,
+) -> Iterator:
+    """
+    Streams the elements matching tag (Clark notation, e.g.
+    '{http://www.tei-c.org/ns/1.0}person') from an XML file.
+    Yields each element, or the return value of mapping(element) if a
+    mapping callback is provided. Nested matching elements are yielded before
+    the element containing them, which is yielded complete. Once an outermost
+    matching element is processed, it and its preceding siblings are cleared,
+    so memory use does not grow with the file size.
+    """
+    context = ET.iterparse(xml_file, events=("start", "end"), tag=tag, huge_tree=True)
+    # number of open matching elements, nested ones are kept until the outermost is done
+    depth = 0
+    for event, node in context:
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if mapping is None:
+            yield node
+        else:
+            yield mapping(node)
+        if depth:
+            continue
+        node.clear(keep_tail=True)
+        parent = node.getparent()
+        if parent is not None:
+            while node.getprevious() is not None:
+                del parent[0]
+    del context
+
+
+@instrumented
+def extract_root_nsmap(
+    xml_file: str,
+) -> dict:
+    """
+    Returns the namespace map (prefix None for the default namespace) of the root element
+    of an XML file without parsing the rest of the file.
+    """
+    for _, node in ET.iterparse(xml_file, events=("start",), huge_tree=True):
+        return dict(node.nsmap)
+    return {}
+
+
+@instrumented
+def find_element_ranges(
+    xml_file: str,
+    tag: str,
+) -> list[tuple[int, int]]:
+    """
+    Returns the (start, end) byte ranges of the outermost elements named tag in an XML file,
+    found by scanning the memory mapped file, without parsing it.
+    tag is the element name as written in the file (e.g. 'person' or 'tei:person');
+    tags inside comments and CDATA sections are skipped.
+    """
+    # comments and CDATA sections are matched as a whole and ignored;
+    # the rest of a tag up to '>' skips quoted attribute values, which may contain '>'
+    pattern = re.compile(
+        rb"(?P<skip><!--.*?-->|<!\[CDATA\[.*?\]\]>)"
+        rb"|<(?P<close>/?)" + re.escape(tag.encode("utf-8")) + rb"(?=[\s/>])(?:[^\"'>]|\"[^\"]*\"|'[^']*')*>",
+        re.DOTALL,
+    )
+    ranges = []
+    with open(xml_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        depth = 0
+        start = 0
+        for match in pattern.finditer(data):
+            if match.group("skip"):
+                continue
+            if match.group("close"):
+                depth -= 1
+            elif data[match.end() - 2:match.end() - 1] != b"/":
+                depth += 1
+                if depth == 1:
+                    start = match.start()
+                continue
+            elif depth == 0:
+                ranges.append(match.span())
+                continue
+            if depth == 0:
+                ranges.append((start, match.end()))
+    return ranges
+
+
+@instrumented
+def parse_xml_fragments(
+    xml_file: str,
+    ranges: Iterable[tuple[int, int]],
+    nsmap: dict,
+) -> Element:
+    """
+    Returns a 'fragment' element wrapping the elements at the (start, end) byte ranges
+    of a (UTF-8 encoded) XML file as parsed children. The namespace declarations of nsmap
+    (e.g. from extract_root_nsmap) are re-injected on the wrapper element.
+    """
+    declarations = "".join(
+        f" xmlns:{prefix}={quoteattr(uri)}" if prefix else f" xmlns={quoteattr(uri)}"
+        for prefix, uri in nsmap.items()
+    )
+    parser = ET.XMLParser(huge_tree=True)
+    parser.feed(f"<fragment{declarations}>".encode("utf-8"))
+    with open(xml_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for start, end in ranges:
+            parser.feed(data[start:end])
+    parser.feed(b"</fragment>")
+    return parser.close()
+
+
+@instrumented
 def extract_xml_nsmap(
     input: Element,
 ) -> dict:
@@ -92,6 +268,33 @@ def extract_xml_nsmap(
     return nsmap
 
 
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _compile_xpath(
+    xpath: str,
+    namespaces: frozenset,
+) -> ET.XPath:
+    nsmap = {"xmlns" if key is None else key: value for key, value in namespaces}
+    return ET.XPath(xpath, namespaces=nsmap)
+
+
+@instrumented
+def compile_xpath(
+    xpath: str,
+    namespaces: dict = None,
+) -> ET.XPath:
+    """
+    Returns a compiled lxml.etree.XPath object.
+    Evaluators are cached (LRU) by xpath and namespaces; a default namespace
+    (None key) is mapped to the 'xmlns' prefix like in extract_xml_nsmap.
+    Cached XPath objects are shared between threads; lxml locks each of them during an evaluation.
+    """
+    return _compile_xpath(xpath, frozenset((namespaces or {}).items()))
+
+
+register_cache("xml.compile_xpath", _compile_xpath)
+
+
+@instrumented
 def get_element_by_xpath(
     node: Element,
     xpath: str,
@@ -99,10 +302,10 @@ def get_element_by_xpath(
     """
     Returns an lxml.etree.Element object.
     """
-    nsmap = extract_xml_nsmap(node)
-    return node.xpath(xpath, namespaces=nsmap)[0]
+    return _compile_xpath(xpath, frozenset(node.nsmap.items()))(node)[0]
 
 
+@instrumented
 def get_elements_by_xpath(
     node: Element,
     xpath: str,
@@ -110,10 +313,29 @@ def get_elements_by_xpath(
     """
     Returns a list of lxml.etree.Element objects.
     """
-    nsmap = extract_xml_nsmap(node)
-    return node.xpath(xpath, namespaces=nsmap)
+    return _compile_xpath(xpath, frozenset(node.nsmap.items()))(node)
+
+
+def _create_literal(
+    node: Element,
+    prefix: str,
+    default_lang: str | bool,
+    lang: str | bool,
+) -> Literal:
+    if next(node.iterchildren(ET.Element), None) is None:
+        if not node.text:
+            return Literal("undefined")
+        text = node.text
+    else:
+        # acdh_tei_pyutils (and its requests dependency) is only imported for mixed content
+        from acdh_tei_pyutils.utils import make_entity_label
+        text, cur_lang = make_entity_label(node, default_lang=lang)
+    if default_lang:
+        return Literal(f"{prefix}{normalize_string(text)}", lang=lang)
+    return Literal(f"{prefix}{normalize_string(text)}")
 
 
+@instrumented
 def create_literal(
     node: Element,
     prefix: str,
@@ -127,52 +349,131 @@ def create_literal(
     if enforce_default_lang:
         lang = default_lang
     else:
-        try:
-            lang = node.attrib["{http://www.w3.org/XML/1998/namespace}lang"]
-        except KeyError:
-            lang = "und"
-    if len(node.xpath("./*")) < 1 and node.text:
-        if default_lang:
-            literal = Literal(f"{prefix}{normalize_string(node.text)}", lang=lang)
-        else:
-            literal = Literal(f"{prefix}{normalize_string(node.text)}")
-    elif len(node.xpath("./*")) >= 1:
-        entity_label_str, cur_lang = make_entity_label(node, default_lang=lang)
-        if default_lang:
-            literal = Literal(f"{prefix}{normalize_string(entity_label_str)}", lang=lang)
+        lang = node.get(XML_LANG, "und")
+    return _create_literal(node, prefix, default_lang, lang)
+
+
+@instrumented
+def create_literals(
+    nodes: Iterable[Element],
+    prefix: str,
+    default_lang: str | bool = False,
+    enforce_default_lang: bool = False,
+) -> list[Literal]:
+    """
+    Extracts text from each provided lxml.etree.Element and
+    returns a list of rdflib Literal objects like create_literal.
+    """
+    if enforce_default_lang:
+        return [_create_literal(x, prefix, default_lang, default_lang) for x in nodes]
+    return [_create_literal(x, prefix, default_lang, x.get(XML_LANG, "und")) for x in nodes]
+
+
+@lru_cache(maxsize=TAG_CACHE_SIZE)
+def tag_local_name(
+    tag: str,
+) -> str:
+    """
+    Returns the lowercased local name of a (Clark notation) tag.
+    """
+    return tag.split("}")[-1].lower()
+
+
+register_cache("xml.tag_local_name", tag_local_name)
+
+
+class URIInterner:
+    """
+    Maps (prefix, tag, id, number) keys to one canonical rdflib URIRef object,
+    so repeated references to an entity share the same URIRef.
+    At most maxsize URIs are kept, the oldest ones are dropped first.
+    hits and misses count the lookups.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000000,
+    ) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._uris = {}
+
+    def __len__(self) -> int:
+        return len(self._uris)
+
+    def get(
+        self,
+        key: tuple,
+    ) -> URIRef | None:
+        """
+        Returns the interned URIRef for key or None.
+        """
+        uri = self._uris.get(key)
+        if uri is None:
+            self.misses += 1
         else:
-            literal = Literal(f"{prefix}{normalize_string(entity_label_str)}")
-    else:
-        literal = Literal("undefined")
-    return literal
+            self.hits += 1
+        return uri
+
+    def add(
+        self,
+        key: tuple,
+        uri: URIRef,
+    ) -> URIRef:
+        """
+        Interns uri for key and returns it.
+        """
+        if len(self._uris) >= self.maxsize:
+            del self._uris[next(iter(self._uris))]
+        self._uris[key] = uri
+        return uri
+
+    def clear(self) -> None:
+        self._uris.clear()
+        self.hits = 0
+        self.misses = 0
 
 
+@instrumented
 def create_uri_from_node_tag(
     node: Element,
     prefix: str,
     number: int = None,
     attribute: str = "{http://www.w3.org/XML/1998/namespace}id",
     generate_uuid: bool = False,
+    interner: URIInterner = None,
 ) -> URIRef:
     """
     Extracts node.tag and [optional] node.attribute from a provided lxml.etree.Element and
     returns a rdflib URIRef object.
+    With an [optional] URIInterner, the same URIRef object is returned for the same
+    prefix, tag, id and number (URIs with a generated uuid are not interned).
     """
-    node_tag = node.tag.split("}")[-1].lower()
+    node_id = node.attrib[attribute] if attribute else None
+    intern = interner is not None and not generate_uuid
+    if intern:
+        key = (prefix, node.tag, node_id, number)
+        uri = interner.get(key)
+        if uri is not None:
+            return uri
+    node_tag = tag_local_name(node.tag)
     if prefix.endswith("/"):
         prefix = prefix[:-1]
     uri_parts = [prefix, node_tag]
     if attribute:
-        node_id = node.attrib[attribute]
         uri_parts.append(node_id)
     if generate_uuid:
         uri_parts.append(str(uuid.uuid4()))
     if number:
         uri_parts.append(str(number))
-    uri = "/".join([x for x in uri_parts if x != "" and x is not None])
-    return URIRef(uri)
+    uri = URIRef("/".join([x for x in uri_parts if x != "" and x is not None]))
+    if intern:
+        interner.add(key, uri)
+    return uri
 
 
+@instrumented
 def create_uri_from_node_tag_by_custom_sequence(
     node: list[Element, int] = [False, False],
     prefix: list[str, int] = [False, False],
@@ -214,6 +515,84 @@ def create_uri_from_node_tag_by_custom_sequence(
     return URIRef(uri)
 
 
+def _node_tag_part(
+    node: Element,
+    number: int,
+) -> str:
+    return tag_local_name(node.tag)
+
+
+def _uuid_part(
+    node: Element,
+    number: int,
+) -> str:
+    return str(uuid.uuid4())
+
+
+def _number_part(
+    node: Element,
+    number: int,
+) -> str:
+    return str(number) if number else None
+
+
+class URITemplate:
+    """
+    A precompiled URI layout, the counterpart of create_uri_from_node_tag_by_custom_sequence.
+    sequence lists the URI parts in order, any of
+    'prefix', 'node', 'attribute', 'generate_uuid' and 'number'.
+    Calling the template with an lxml.etree.Element returns a rdflib URIRef object.
+    """
+
+    def __init__(
+        self,
+        sequence: list[str],
+        prefix: str = None,
+        attribute: str = "{http://www.w3.org/XML/1998/namespace}id",
+        number: int = None,
+    ) -> None:
+        if prefix and prefix.endswith("/"):
+            prefix = prefix[:-1]
+        self.sequence = tuple(sequence)
+        self.prefix = prefix
+        self.attribute = attribute
+        self.number = number
+        steps = []
+        for part in self.sequence:
+            if part == "prefix":
+                steps.append(lambda node, number, value=prefix: value)
+            elif part == "node":
+                steps.append(_node_tag_part)
+            elif part == "attribute":
+                steps.append(lambda node, number, key=attribute: node.attrib[key])
+            elif part == "generate_uuid":
+                steps.append(_uuid_part)
+            elif part == "number":
+                steps.append(_number_part)
+            else:
+                raise ValueError(f"Unknown URI part '{part}'.")
+        self._steps = tuple(steps)
+
+    def __call__(
+        self,
+        node: Element,
+        number: int = None,
+    ) -> URIRef:
+        if number is None:
+            number = self.number
+        return URIRef("/".join([x for x in [step(node, number) for step in self._steps] if x]))
+
+    def many(
+        self,
+        nodes: Iterable[Element],
+    ) -> list[URIRef]:
+        """
+        Returns a list of rdflib URIRef objects, one for each node.
+        """
+        return [self(x) for x in nodes]
+
+
+@instrumented
 def uri_handling_condition(
     node: Element,
     condition_attribute: str,
@@ -228,6 +607,7 @@ def uri_handling_condition(
     return False
 
 
+@instrumented
 def create_literal_from_coordinates(
     node: Element,
     datatype: URIRef = GEO['wktLiteral'],
@@ -241,3 +621,42 @@ def create_literal_from_coordinates(
     longitude = node.text.split(split_char)[0]
     latitude = node.text.split(split_char)[1]
     return Literal(f"Point({longitude} {latitude})", datatype=datatype)
+
+
+@instrumented
+def create_literals_from_coordinates(
+    nodes: Iterable[Element | str],
+    datatype: URIRef = GEO['wktLiteral'],
+    split_char: str = " ",
+    swap: bool = False,
+) -> tuple[list[Literal | None], list[tuple[int, str, str]]]:
+    """
+    Extracts the coordinates from each provided lxml.etree.Element (or string),
+    validates that they are two finite numbers and
+    returns a tuple of (list of rdflib Literal objects, list of errors).
+    The coordinates are kept in their order unless swap is set.
+    Invalid rows get None in the literal list and an (index, text, reason)
+    entry in the error list.
+    """
+    literals, errors = [], []
+    whitespace = split_char.isspace()
+    for index, node in enumerate(nodes):
+        text = node if isinstance(node, str) else node.text
+        values = (text or "").split() if whitespace else (text or "").split(split_char)
+        if len(values) != 2:
+            literals.append(None)
+            errors.append((index, text, f"expected 2 values, got {len(values)}"))
+            continue
+        first, second = values[0].strip(), values[1].strip()
+        try:
+            valid = math.isfinite(float(first)) and math.isfinite(float(second))
+        except ValueError:
+            valid = False
+        if not valid:
+            literals.append(None)
+            errors.append((index, text, "not a number"))
+            continue
+        if swap:
+            first, second = second, first
+        literals.append(Literal(f"Point({first} {second})", datatype=datatype))
+    return literals, errors
@@ -0,0 +1,57 @@
+"""Compares the XPath based child check of the former create_literal against create_literal/create_literals."""
+import timeit
+
+from acdh_tei_pyutils.utils import make_entity_label
+from rdflib import Literal
+
+from acdh_graph_pyutils.string_utils import normalize_string
+from acdh_graph_pyutils.xml import (
+    parse_xml,
+    get_elements_by_xpath,
+    create_literal,
+    create_literals,
+)
+
+
+NUMBER = 200
+
+
+def create_literal_xpath(node, prefix, default_lang=False, enforce_default_lang=False):
+    if enforce_default_lang:
+        lang = default_lang
+    else:
+        try:
+            lang = node.attrib["{http://www.w3.org/XML/1998/namespace}lang"]
+        except KeyError:
+            lang = "und"
+    if len(node.xpath("./*")) < 1 and node.text:
+        if default_lang:
+            literal = Literal(f"{prefix}{normalize_string(node.text)}", lang=lang)
+        else:
+            literal = Literal(f"{prefix}{normalize_string(node.text)}")
+    elif len(node.xpath("./*")) >= 1:
+        entity_label_str, cur_lang = make_entity_label(node, default_lang=lang)
+        if default_lang:
+            literal = Literal(f"{prefix}{normalize_string(entity_label_str)}", lang=lang)
+        else:
+            literal = Literal(f"{prefix}{normalize_string(entity_label_str)}")
+    else:
+        literal = Literal("undefined")
+    return literal
+
+
+def main():
+    root = parse_xml("./tests/sample.xml")
+    nodes = get_elements_by_xpath(root, "//xmlns:placeName|//xmlns:orgName|//xmlns:persName") * 50
+    results = {
+        "xpath child check": timeit.timeit(lambda: [create_literal_xpath(x, "", "en") for x in nodes], number=NUMBER),
+        "create_literal": timeit.timeit(lambda: [create_literal(x, "", "en") for x in nodes], number=NUMBER),
+        "create_literals": timeit.timeit(lambda: create_literals(nodes, "", "en"), number=NUMBER),
+    }
+    baseline = results["xpath child check"]
+    for name, seconds in results.items():
+        print(f"{name:<20} {seconds / NUMBER / len(nodes) * 1e6:8.2f} us/node  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures the import time of the package modules with python -X importtime.
+
+Each module is imported in a fresh interpreter (best of --repeat runs), e.g.
+
+    python benchmarks/bench_import.py --max-ms 250
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+
+MODULES = [
+    "acdh_graph_pyutils.string_utils",
+    "acdh_graph_pyutils.xml",
+    "acdh_graph_pyutils.graph",
+]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times(module: str) -> tuple[float, dict[str, float]]:
+    """
+    Returns the cumulative import time of module and of its direct imports in ms.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    # (indent, name, cumulative us); children are listed before their parent
+    lines = [(len(x.group(3)), x.group(4), int(x.group(2))) for x in map(LINE.match, stderr.splitlines()) if x]
+    index = max(i for i, x in enumerate(lines) if x[1] == module)
+    indent, _, total = lines[index]
+    children = {}
+    for child_indent, name, cumulative in reversed(lines[:index]):
+        if child_indent <= indent:
+            break
+        if child_indent == indent + 2:
+            children[name] = cumulative / 1000
+    return total / 1000, children
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="number of slowest dependencies to list per module")
+    parser.add_argument("--max-ms", type=float, help="exit with 1 if a module takes longer to import")
+    args = parser.parse_args(argv)
+    too_slow = False
+    for module in MODULES:
+        total_ms, children = min((import_times(module) for _ in range(args.repeat)), key=lambda x: x[0])
+        too_slow = too_slow or (args.max_ms is not None and total_ms > args.max_ms)
+        print(f"{module:<40} {total_ms:8.1f} ms")
+        for name, cumulative_ms in sorted(children.items(), key=lambda x: -x[1])[:args.top]:
+            print(f"    {name:<36} {cumulative_ms:8.1f} ms")
+    return 1 if too_slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Compares a hand-written per-field XPath mapping against the same mapping compiled with compile_mapping."""
+import os
+import tempfile
+import time
+
+from synthetic import write_tei
+from rdflib.namespace import RDF, RDFS
+from acdh_graph_pyutils.mapping import compile_mapping
+from acdh_graph_pyutils.namespaces import NAMESPACES
+from acdh_graph_pyutils.string_utils import cached_date_to_literal
+from acdh_graph_pyutils.xml import (
+    parse_xml,
+    get_elements_by_xpath,
+    create_literal,
+    create_uri_from_node_tag,
+    extract_begin_end,
+)
+
+
+PREFIX = "https://example.org/"
+CIDOC = NAMESPACES["cidoc"]
+
+SPEC = {"entities": [{
+    "tag": "tei:person",
+    "uri": {"prefix": PREFIX},
+    "type": "cidoc:E21_Person",
+    "fields": [
+        {"path": "tei:persName", "predicate": "rdfs:label", "lang": "en"},
+        {"path": "tei:birth/tei:date", "kind": "date", "begin": "cidoc:P82a_begin_of_the_begin"},
+        {"path": "tei:death/tei:date", "kind": "date", "end": "cidoc:P82b_end_of_the_end"},
+    ],
+}]}
+
+
+def xpath_mapping(root):
+    triples = []
+    for person in get_elements_by_xpath(root, "//xmlns:person"):
+        uri = create_uri_from_node_tag(person, PREFIX)
+        triples.append((uri, RDF.type, CIDOC["E21_Person"]))
+        for name in get_elements_by_xpath(person, "./xmlns:persName"):
+            triples.append((uri, RDFS.label, create_literal(name, "", "en")))
+        for date in get_elements_by_xpath(person, "./xmlns:birth/xmlns:date"):
+            begin, _ = extract_begin_end(date)
+            triples.append((uri, CIDOC["P82a_begin_of_the_begin"], cached_date_to_literal(begin)))
+        for date in get_elements_by_xpath(person, "./xmlns:death/xmlns:date"):
+            _, end = extract_begin_end(date)
+            triples.append((uri, CIDOC["P82b_end_of_the_end"], cached_date_to_literal(end)))
+    return triples
+
+
+def main(entities: int = 20000):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = parse_xml(write_tei(os.path.join(tmp, "tei.xml"), entities))
+    plan = compile_mapping(SPEC)
+    # triple generation only, adding them to a graph costs the same for both
+    results = {}
+    for name, function in (("per-field xpath", xpath_mapping), ("compile_mapping", lambda x: list(plan.triples(x)))):
+        start = time.perf_counter()
+        triples = function(root)
+        results[name] = (time.perf_counter() - start, set(triples))
+    baseline = results["per-field xpath"][0]
+    for name, (seconds, triples) in results.items():
+        print(f"{name:<18} {seconds:8.3f} s  {len(triples):>9} triples  {baseline / seconds:5.2f}x")
+    assert results["per-field xpath"][1] == results["compile_mapping"][1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compares the former double pass normalize_string against normalize_string, normalize_strings and the cached mode."""
+import random
+import timeit
+import unicodedata
+
+from synthetic import FORENAMES, SURNAMES, PLACES
+from acdh_graph_pyutils.string_utils import (
+    normalize_string,
+    normalize_strings,
+    cached_normalize_string,
+)
+
+
+NUMBER = 20
+
+
+def normalize_string_double_pass(string, nfc=False):
+    string = " ".join(" ".join(string.split()).split())
+    if nfc:
+        return unicodedata.normalize("NFC", string)
+    return string
+
+
+def labels(count: int, seed: int = 42) -> list[str]:
+    # TEI label text: pretty printed (newlines, indentation), few distinct values
+    rng = random.Random(seed)
+    return [
+        rng.choice([
+            f"\n            {rng.choice(SURNAMES)},\n            {rng.choice(FORENAMES)}\n        ",
+            f"{rng.choice(PLACES)}  (Österreich)",
+            f"  {rng.choice(FORENAMES)}   {rng.choice(SURNAMES)} ",
+        ])
+        for _ in range(count)
+    ]
+
+
+def main():
+    strings = labels(100000)
+    for nfc in (False, True):
+        results = {
+            "double pass": timeit.timeit(
+                lambda: [normalize_string_double_pass(x, nfc) for x in strings], number=NUMBER
+            ),
+            "normalize_string": timeit.timeit(lambda: [normalize_string(x, nfc) for x in strings], number=NUMBER),
+            "normalize_strings": timeit.timeit(lambda: normalize_strings(strings, nfc), number=NUMBER),
+            "cached_normalize_string": timeit.timeit(
+                lambda: [cached_normalize_string(x, nfc) for x in strings], number=NUMBER
+            ),
+        }
+        baseline = results["double pass"]
+        print(f"nfc={nfc}")
+        for name, seconds in results.items():
+            print(f"  {name:<24} {seconds / NUMBER / len(strings) * 1e9:8.1f} ns/string  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
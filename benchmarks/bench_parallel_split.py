@@ -0,0 +1,46 @@
+"""Compares parse_xml plus mapping on one large TEI file with build_graph_parallel_split."""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import write_tei
+from acdh_graph_pyutils.graph import create_empty_graph, create_memory_store
+from acdh_graph_pyutils.mapping import compile_mapping
+from acdh_graph_pyutils.parallel import build_graph_parallel_split
+from acdh_graph_pyutils.xml import parse_xml
+
+
+PLAN = compile_mapping({"entities": [{
+    "tag": "tei:person",
+    "uri": {"prefix": "https://example.org/"},
+    "type": "cidoc:E21_Person",
+    "fields": [
+        {"path": "tei:persName", "predicate": "rdfs:label", "lang": "en"},
+        {"path": "tei:birth/tei:date", "kind": "date", "begin": "cidoc:P82a_begin_of_the_begin"},
+        {"path": "tei:death/tei:date", "kind": "date", "end": "cidoc:P82b_end_of_the_end"},
+    ],
+}]})
+
+
+def mapping(graph, root):
+    return PLAN.run(root, graph)
+
+
+def main(size: int = 50000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_file = os.path.join(tmp, "persons.xml")
+        write_tei(xml_file, size)
+        start = time.perf_counter()
+        graph = mapping(create_empty_graph(store=create_memory_store()), parse_xml(xml_file))
+        baseline = time.perf_counter() - start
+        print(f"{len(graph)} triples, {os.cpu_count()} cpus")
+        print(f"{'parse_xml + mapping':<30} {baseline:8.3f} s")
+        start = time.perf_counter()
+        build_graph_parallel_split(xml_file, "person", mapping)
+        seconds = time.perf_counter() - start
+        print(f"{'build_graph_parallel_split':<30} {seconds:8.3f} s  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,44 @@
+"""Compares a single gzip N-Triples dump (stream_serialize_graph) with export_graph_sharded."""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import write_tei
+from acdh_graph_pyutils.graph import create_empty_graph, create_memory_store, stream_serialize_graph
+from acdh_graph_pyutils.mapping import compile_mapping
+from acdh_graph_pyutils.parallel import export_graph_sharded
+from acdh_graph_pyutils.xml import parse_xml
+
+
+SPEC = {"entities": [{
+    "tag": "tei:person",
+    "uri": {"prefix": "https://example.org/"},
+    "type": "cidoc:E21_Person",
+    "fields": [
+        {"path": "tei:persName", "predicate": "rdfs:label", "lang": "en"},
+        {"path": "tei:birth/tei:date", "kind": "date", "begin": "cidoc:P82a_begin_of_the_begin"},
+        {"path": "tei:death/tei:date", "kind": "date", "end": "cidoc:P82b_end_of_the_end"},
+    ],
+}]}
+
+
+def main(size: int = 50000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_file = os.path.join(tmp, "persons.xml")
+        write_tei(xml_file, size)
+        graph = compile_mapping(SPEC).run(parse_xml(xml_file), create_empty_graph(store=create_memory_store()))
+        print(f"{len(graph)} triples, {os.cpu_count()} cpus")
+        start = time.perf_counter()
+        stream_serialize_graph(graph, os.path.join(tmp, "graph.nt.gz"))
+        baseline = time.perf_counter() - start
+        print(f"{'stream_serialize_graph':<28} {baseline:8.3f} s")
+        for shards in (4, 16):
+            start = time.perf_counter()
+            export_graph_sharded(graph, os.path.join(tmp, f"shards-{shards}"), shards=shards)
+            seconds = time.perf_counter() - start
+            print(f"{f'export_graph_sharded ({shards})':<28} {seconds:8.3f} s  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,36 @@
+"""Compares per-call XPath parsing against the cached evaluators in acdh_graph_pyutils.xml."""
+import timeit
+
+from acdh_graph_pyutils.xml import (
+    parse_xml,
+    extract_xml_nsmap,
+    compile_xpath,
+    get_elements_by_xpath,
+)
+
+
+XPATH = "./xmlns:persName[@type='full']"
+NUMBER = 20000
+
+
+def uncached(node):
+    nsmap = extract_xml_nsmap(node)
+    return node.xpath(XPATH, namespaces=nsmap)
+
+
+def main():
+    root = parse_xml("./tests/sample.xml")
+    node = root.xpath("//xmlns:person", namespaces=extract_xml_nsmap(root))[0]
+    xpath = compile_xpath(XPATH, extract_xml_nsmap(root))
+    results = {
+        "node.xpath (uncached)": timeit.timeit(lambda: uncached(node), number=NUMBER),
+        "get_elements_by_xpath": timeit.timeit(lambda: get_elements_by_xpath(node, XPATH), number=NUMBER),
+        "compile_xpath (hoisted)": timeit.timeit(lambda: xpath(node), number=NUMBER),
+    }
+    baseline = results["node.xpath (uncached)"]
+    for name, seconds in results.items():
+        print(f"{name:<26} {seconds / NUMBER * 1e6:8.2f} us/call  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
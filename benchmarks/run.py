@@ -0,0 +1,176 @@
+"""
+Benchmark suite for the xml, string_utils and graph helpers.
+
+Runs every benchmark on synthetic TEI documents of the given sizes and reports
+throughput (items per second), the peak Python heap of a second run (tracemalloc,
+does not see lxml's C allocations) and the process max RSS so far, e.g.
+
+    python benchmarks/run.py --sizes 10000 100000 1000000 --json results.json
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from rdflib import URIRef
+
+from synthetic import write_tei
+from acdh_graph_pyutils.graph import (
+    create_empty_graph,
+    create_memory_store,
+    create_type_triple,
+    create_label_triple,
+    create_value_triple,
+    create_sameAs_triple,
+    serialize_graph,
+)
+from acdh_graph_pyutils.namespaces import NAMESPACES
+from acdh_graph_pyutils.string_utils import date_to_literal
+from acdh_graph_pyutils.xml import (
+    parse_xml,
+    get_elements_by_xpath,
+    create_literal,
+    create_uri_from_node_tag,
+    create_uri_from_node_tag_by_custom_sequence,
+    extract_begin_end,
+)
+
+
+PREFIX = "https://example.org/"
+
+
+def setup(path: str) -> dict:
+    root = parse_xml(path)
+    persons = get_elements_by_xpath(root, "//xmlns:person")
+    dates = get_elements_by_xpath(root, "//xmlns:date")
+    uris = [create_uri_from_node_tag(x, PREFIX) for x in persons]
+    graph = create_empty_graph(store=create_memory_store())
+    for uri in uris:
+        create_type_triple(graph, uri, NAMESPACES["cidoc"]["E21_Person"])
+    return {
+        "path": path,
+        "root": root,
+        "persons": persons,
+        "names": get_elements_by_xpath(root, "//xmlns:persName"),
+        "dates": dates,
+        "date_strs": [x.get("when-iso") or x.get("notBefore") for x in dates],
+        "uris": uris,
+        "graph": graph,
+    }
+
+
+def bench_parse_xml(data):
+    parse_xml(data["path"])
+    return len(data["persons"])
+
+
+def bench_get_elements_by_xpath(data):
+    for x in data["persons"]:
+        get_elements_by_xpath(x, "./xmlns:persName")
+    return len(data["persons"])
+
+
+def bench_create_literal(data):
+    for x in data["names"]:
+        create_literal(x, "", "en")
+    return len(data["names"])
+
+
+def bench_create_uri_from_node_tag(data):
+    for x in data["persons"]:
+        create_uri_from_node_tag(x, PREFIX)
+    return len(data["persons"])
+
+
+def bench_create_uri_from_node_tag_by_custom_sequence(data):
+    for x in data["persons"]:
+        create_uri_from_node_tag_by_custom_sequence(
+            node=[x, 1],
+            prefix=[PREFIX, 0],
+            attribute=["{http://www.w3.org/XML/1998/namespace}id", 2],
+        )
+    return len(data["persons"])
+
+
+def bench_extract_begin_end(data):
+    for x in data["dates"]:
+        extract_begin_end(x)
+    return len(data["dates"])
+
+
+def bench_date_to_literal(data):
+    for x in data["date_strs"]:
+        date_to_literal(x)
+    return len(data["date_strs"])
+
+
+def bench_create_triples(data):
+    graph = create_empty_graph(store=create_memory_store())
+    e21 = NAMESPACES["cidoc"]["E21_Person"]
+    for uri in data["uris"]:
+        create_type_triple(graph, uri, e21)
+        create_label_triple(graph, uri, date_to_literal(None))
+        create_value_triple(graph, uri, date_to_literal(None))
+        create_sameAs_triple(graph, uri, URIRef(f"{uri}/gnd"))
+    return len(data["uris"]) * 4
+
+
+def bench_serialize_graph(data):
+    with tempfile.TemporaryDirectory() as tmp:
+        serialize_graph(data["graph"], format="nt", to_file=os.path.join(tmp, "graph.nt"))
+    return len(data["graph"])
+
+
+BENCHMARKS = {
+    name[len("bench_"):]: function
+    for name, function in sorted(globals().items())
+    if name.startswith("bench_")
+}
+
+
+def measure(function, data, memory: bool) -> dict:
+    start = time.perf_counter()
+    items = function(data)
+    seconds = time.perf_counter() - start
+    result = {"items": items, "seconds": seconds, "items_per_second": items / seconds if seconds else None}
+    if memory:
+        tracemalloc.start()
+        function(data)
+        result["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    result["maxrss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+    return result
+
+
+def main(argv=None) -> list[dict]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000], help="number of persons per document")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slower) peak memory runs")
+    parser.add_argument("--json", help="write the results to a JSON file")
+    args = parser.parse_args(argv)
+    results = []
+    warnings.simplefilter("ignore", UserWarning)
+    print(f"{'benchmark':<45} {'size':>9} {'items':>9} {'seconds':>9} {'items/s':>12} {'peak MiB':>9} "
+          f"{'RSS MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            data = setup(write_tei(os.path.join(tmp, f"tei-{size}.xml"), size))
+            for name in args.only or BENCHMARKS:
+                result = {"benchmark": name, "size": size, **measure(BENCHMARKS[name], data, not args.no_memory)}
+                results.append(result)
+                peak = f"{result['peak_mib']:9.1f}" if "peak_mib" in result else f"{'-':>9}"
+                print(f"{name:<45} {size:>9} {result['items']:>9} {result['seconds']:>9.3f} "
+                      f"{result['items_per_second'] or 0:>12.0f} {peak} {result['maxrss_mib']:>9.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Generates synthetic TEI documents with persons, places and dates for the benchmarks."""
+import random
+
+
+TEI_NS = "http://www.tei-c.org/ns/1.0"
+
+FORENAMES = ["Olaf", "Anna", "Maria", "Johann", "Franz", "Hanna", "Karl", "Leopold", "Theresia", "Josef"]
+SURNAMES = ["Gulbransson", "Huber", "Gruber", "Bauer", "Wagner", "Müller", "Pichler", "Steiner", "Moser", "Mayer"]
+PLACES = ["Wien", "Graz", "Linz", "Salzburg", "Innsbruck", "Klagenfurt", "Bregenz", "Eisenstadt", "St. Pölten"]
+
+
+def _date(rng: random.Random) -> str:
+    year = rng.randint(1600, 1999)
+    kind = rng.random()
+    if kind < 0.4:
+        return f"{year}"
+    if kind < 0.6:
+        return f"{year}-{rng.randint(1, 12):02d}"
+    return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def person(index: int, rng: random.Random) -> str:
+    forename, surname = rng.choice(FORENAMES), rng.choice(SURNAMES)
+    birth, death = _date(rng), _date(rng)
+    return (
+        f'<person xml:id="pers{index:07d}">'
+        f'<persName xml:lang="de"><forename>{forename}</forename> <surname>{surname}</surname></persName>'
+        f'<persName type="full">  {surname},   {forename} </persName>'
+        f'<birth><date when-iso="{birth}">{birth}</date><placeName>{rng.choice(PLACES)}</placeName></birth>'
+        f'<death><date notBefore="{death}" notAfter="{death}">{death}</date></death>'
+        f'<occupation notBefore="{birth}" to="{death}">Maler</occupation>'
+        f'<idno type="GND">{rng.randint(10000000, 99999999)}</idno>'
+        "</person>"
+    )
+
+
+def place(index: int, rng: random.Random) -> str:
+    return (
+        f'<place xml:id="place{index:07d}">'
+        f'<placeName xml:lang="de">{rng.choice(PLACES)}</placeName>'
+        f"<location><geo>{rng.uniform(46, 49):.5f} {rng.uniform(9, 17):.5f}</geo></location>"
+        "</place>"
+    )
+
+
+def write_tei(
+    path: str,
+    entities: int,
+    seed: int = 42,
+) -> str:
+    """
+    Writes a TEI document with entities persons and entities // 10 places to path.
+    Returns path.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<TEI xmlns="{TEI_NS}"><text><body><listPerson>')
+        for i in range(entities):
+            f.write(person(i, rng))
+        f.write("</listPerson><listPlace>")
+        for i in range(entities // 10):
+            f.write(place(i, rng))
+        f.write("</listPlace></body></text></TEI>")
+    return path
@@ -1,8 +1,23 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import types
 import unittest
+from functools import partial
+from unittest import mock
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
 import lxml.etree as ET
 
-from rdflib import Graph, Literal, URIRef, Namespace
-from rdflib.namespace import OWL, RDF
+from rdflib import BNode, Graph, Literal, URIRef, Namespace, XSD
+from rdflib.namespace import OWL, RDF, RDFS
 from acdh_graph_pyutils.namespaces import NAMESPACES
 from acdh_graph_pyutils.graph import (
     create_empty_graph,
@@ -12,27 +27,93 @@ from acdh_graph_pyutils.graph import (
     create_value_triple,
     create_sameAs_triple,
     serialize_graph,
+    stream_serialize_graph,
     create_conjunctive_graph,
-    create_memory_store
+    create_memory_store,
+    create_disk_store,
+    create_columnar_store,
+    merge_graphs,
+    TripleBuffer,
+    DISK_GRAPH_IDENTIFIER
+)
+from acdh_graph_pyutils.string_utils import (
+    normalize_string,
+    normalize_strings,
+    cached_normalize_string,
+    date_to_literal,
+    cached_date_to_literal,
+    dates_to_literals
 )
-from acdh_graph_pyutils.string_utils import normalize_string, date_to_literal
 from acdh_graph_pyutils.xml import (
     extract_begin_end,
+    extract_begin_end_many,
     parse_xml,
+    iterparse_xml,
     extract_xml_nsmap,
+    compile_xpath,
     get_element_by_xpath,
     get_elements_by_xpath,
     create_literal,
+    create_literals,
     create_uri_from_node_tag,
+    tag_local_name,
+    URIInterner,
     create_uri_from_node_tag_by_custom_sequence,
+    URITemplate,
     uri_handling_condition,
-    create_literal_from_coordinates
+    create_literal_from_coordinates,
+    create_literals_from_coordinates,
+    extract_root_nsmap,
+    find_element_ranges,
+    parse_xml_fragments
+)
+from acdh_graph_pyutils.parallel import (
+    build_graph_parallel,
+    build_graph_parallel_split,
+    export_graph_sharded,
+    shard_of
+)
+from acdh_graph_pyutils.incremental import build_graph_incremental
+from acdh_graph_pyutils.remote import iter_remote_xml
+from acdh_graph_pyutils.mapping import compile_mapping, load_mapping
+from acdh_graph_pyutils.sameas import SameAsIndex
+from acdh_graph_pyutils.delta import (
+    compute_delta,
+    delta_to_sparql_update,
+    diff_sorted_ntriples,
+    sort_ntriples
+)
+from acdh_graph_pyutils.instrumentation import (
+    enable_instrumentation,
+    disable_instrumentation,
+    get_stats,
+    register_cache
 )
 
 
 GEO = Namespace("http://www.opengis.net/ont/geosparql#")
 
 
+class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class CountingHTTPRequestHandler(QuietHTTPRequestHandler):
+    def __init__(self, requests, *args, **kwargs):
+        requests.append(None)
+        super().__init__(*args, **kwargs)
+
+
+def map_persons(graph, root):
+    for x in get_elements_by_xpath(root, "//xmlns:person"):
+        uri = create_uri_from_node_tag(node=x, prefix="http://example.com/")
+        create_type_triple(graph, uri, NAMESPACES["cidoc"]["E21_Person"])
+        for name in get_elements_by_xpath(x, "./xmlns:persName"):
+            create_label_triple(graph, uri, create_literal(node=name, prefix="", default_lang="en"))
+    return graph
+
+
 class TestTestTest(unittest.TestCase):
     """Tests for `acdh_graph_pyutils` package."""
 
@@ -65,7 +146,7 @@ class TestTestTest(unittest.TestCase):
             predicate=OWL.sameAs,
             object=URIRef("http://example.com/object")
         )
-        data = serialize_graph(graph=g, format="turtle", to_file="003.ttl")
+        data = serialize_graph(graph=g, format="turtle", to_file="003.ttl", return_string=True)
         self.assertIn("http://example.com/subject", data)
         self.assertIn("http://example.com/object", data)
         self.assertIn("owl:sameAs", data)
@@ -82,7 +163,7 @@ class TestTestTest(unittest.TestCase):
             object=URIRef("http://example.com/object")
         )
         self.assertIsInstance(g, Graph)
-        data = serialize_graph(graph=g, format="turtle", to_file="004.ttl")
+        data = serialize_graph(graph=g, format="turtle", to_file="004.ttl", return_string=True)
         self.assertIn("http://example.com/subject", data)
         self.assertIn("http://example.com/object", data)
         self.assertIn("a <http:", data)
@@ -98,7 +179,7 @@ class TestTestTest(unittest.TestCase):
             object=URIRef("http://example.com/object")
         )
         self.assertIsInstance(g, Graph)
-        data = serialize_graph(graph=g, format="turtle", to_file="005.ttl")
+        data = serialize_graph(graph=g, format="turtle", to_file="005.ttl", return_string=True)
         self.assertIn("http://example.com/subject", data)
         self.assertIn("http://example.com/object", data)
         self.assertIn("a <http:", data)
@@ -114,7 +195,7 @@ class TestTestTest(unittest.TestCase):
             object=URIRef("http://example.com/object")
         )
         self.assertIsInstance(g, Graph)
-        data = serialize_graph(graph=g, format="turtle", to_file="006.ttl")
+        data = serialize_graph(graph=g, format="turtle", to_file="006.ttl", return_string=True)
         self.assertIn("http://example.com/subject", data)
         self.assertIn("http://example.com/object", data)
         self.assertIn("rdf:value", data)
@@ -130,7 +211,7 @@ class TestTestTest(unittest.TestCase):
             object=URIRef("http://example.com/object")
         )
         self.assertIsInstance(g, Graph)
-        data = serialize_graph(graph=g, format="turtle", to_file="007.ttl")
+        data = serialize_graph(graph=g, format="turtle", to_file="007.ttl", return_string=True)
         self.assertIn("http://example.com/subject", data)
         self.assertIn("http://example.com/object", data)
         self.assertIn("rdfs:label", data)
@@ -146,7 +227,7 @@ class TestTestTest(unittest.TestCase):
             object=URIRef("http://example.com/object")
         )
         self.assertIsInstance(g, Graph)
-        data = serialize_graph(graph=g, format="turtle", to_file="008.ttl")
+        data = serialize_graph(graph=g, format="turtle", to_file="008.ttl", return_string=True)
         self.assertIn("http://example.com/subject", data)
         self.assertIn("http://example.com/object", data)
         self.assertIn("owl:sameAs", data)
@@ -167,7 +248,7 @@ class TestTestTest(unittest.TestCase):
             store=store
         )
         self.assertIsInstance(g, Graph)
-        data = serialize_graph(graph=g, format="trig", to_file="009.trig")
+        data = serialize_graph(graph=g, format="trig", to_file="009.trig", return_string=True)
         self.assertIn("ns1:identifier", data)
 
     def test_010_normalize_string(self):
@@ -316,3 +397,663 @@ class TestTestTest(unittest.TestCase):
         self.assertIsInstance(end, str)
         self.assertEqual(begin, "1905-07-04")
         self.assertEqual(end, "2000")
+
+    def test_022_iterparse_xml(self):
+        uris = list(iterparse_xml(
+            "./tests/sample.xml",
+            tag="{http://www.tei-c.org/ns/1.0}person",
+            mapping=lambda x: create_uri_from_node_tag(node=x, prefix="http://example.com/")
+        ))
+        self.assertEqual(len(uris), 4)
+        self.assertEqual(uris[0], URIRef("http://example.com/person/DWpers0091"))
+        nodes = []
+        for x in iterparse_xml("./tests/sample.xml", tag="{http://www.tei-c.org/ns/1.0}place"):
+            self.assertIsNotNone(get_element_by_xpath(x, "./xmlns:placeName"))
+            nodes.append(x)
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(len(nodes[0]), 0)
+        tei = "{http://www.tei-c.org/ns/1.0}"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "places.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(
+                    '<listPlace xmlns="http://www.tei-c.org/ns/1.0">'
+                    '<place xml:id="austria"><placeName>Österreich</placeName>'
+                    '<place xml:id="vienna"><placeName>Wien</placeName></place></place>'
+                    '<place xml:id="graz"><placeName>Graz</placeName></place></listPlace>'
+                )
+            places = list(iterparse_xml(path, tag=f"{tei}place", mapping=lambda x: (
+                x.get("{http://www.w3.org/XML/1998/namespace}id"),
+                [y.text for y in x.findall(f"{tei}placeName")],
+                len(x.findall(f"{tei}place")),
+            )))
+            self.assertEqual(places, [("vienna", ["Wien"], 0), ("austria", ["Österreich"], 1), ("graz", ["Graz"], 0)])
+            names = list(iterparse_xml(path, tag=[f"{tei}place", f"{tei}placeName"], mapping=lambda x: len(x)))
+            self.assertEqual(names, [0, 0, 1, 2, 0, 1])
+
+    def test_023_compile_xpath(self):
+        xml = parse_xml("./tests/sample.xml")
+        nsmap = extract_xml_nsmap(xml)
+        xpath = compile_xpath("//xmlns:person", nsmap)
+        self.assertIsInstance(xpath, ET.XPath)
+        self.assertIs(xpath, compile_xpath("//xmlns:person", nsmap))
+        self.assertEqual(xpath(xml), get_elements_by_xpath(xml, "//xmlns:person"))
+        xpath = compile_xpath("//xmlns:person", xml.nsmap)
+        self.assertEqual(len(xpath(xml)), 4)
+
+    def test_024_triple_buffer(self):
+        g = create_empty_graph(
+            namespaces=NAMESPACES,
+            identifier=URIRef("http://example.com/identifier"),
+            store=create_memory_store()
+        )
+        subject = URIRef("http://example.com/subject")
+        with TripleBuffer(graph=g, batch_size=3) as buffer:
+            buffer.add_type(subject, URIRef("http://example.com/type"))
+            buffer.add_label(subject, Literal("label"))
+            self.assertEqual(len(g), 0)
+            buffer.add_value(subject, Literal("value"))
+            self.assertEqual(len(g), 3)
+            self.assertEqual(len(buffer), 0)
+            buffer.add_sameAs(subject, URIRef("http://example.com/object"))
+            buffer.add(subject, OWL.sameAs, URIRef("http://example.com/object"))
+        self.assertEqual(len(g), 4)
+        self.assertIn((subject, RDFS.label, Literal("label")), g)
+        self.assertIn((subject, OWL.sameAs, URIRef("http://example.com/object")), g)
+        conjunctive_graph = create_conjunctive_graph(store=create_memory_store())
+        TripleBuffer(graph=conjunctive_graph).add_type(subject, URIRef("http://example.com/type")).flush()
+        self.assertEqual(len(conjunctive_graph), 1)
+
+    def test_025_build_graph_parallel(self):
+        xml_files = ["./tests/sample.xml", "./tests/sample.xml"]
+        serial_graph = create_empty_graph(store=create_memory_store())
+        for x in xml_files:
+            map_persons(serial_graph, parse_xml(x))
+        g = build_graph_parallel(xml_files, map_persons, max_workers=2)
+        self.assertIsInstance(g, Graph)
+        self.assertEqual(len(g), 9)
+        self.assertEqual(set(g), set(serial_graph))
+        conjunctive_graph = create_conjunctive_graph(store=create_memory_store())
+        build_graph_parallel(xml_files, map_persons, graph=conjunctive_graph, max_workers=2)
+        self.assertEqual([x.identifier for x in conjunctive_graph.contexts()],
+                         [conjunctive_graph.default_context.identifier])
+        self.assertEqual(set(conjunctive_graph.default_context), set(serial_graph))
+
+    def test_026_stream_serialize_graph(self):
+        g = create_empty_graph(
+            namespaces=NAMESPACES,
+            identifier=URIRef("http://example.com/identifier"),
+            store=create_memory_store()
+        )
+        map_persons(g, parse_xml("./tests/sample.xml"))
+        self.assertIsNone(serialize_graph(graph=g, format="nt", to_file="026.nt"))
+        with open("026.nt", encoding="utf-8") as f:
+            expected = set(f.read().splitlines()) - {""}
+        stream = io.BytesIO()
+        count = stream_serialize_graph(g, stream, format="nt", chunk_size=2)
+        self.assertEqual(count, 9)
+        self.assertEqual(set(stream.getvalue().decode("utf-8").splitlines()), expected)
+        stream_serialize_graph(g, "026.nt.gz")
+        with gzip.open("026.nt.gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(set(f.read().splitlines()), expected)
+        stream = io.BytesIO()
+        stream_serialize_graph(create_conjunctive_graph(store=g.store), stream, format="nquads")
+        self.assertIn("<http://example.com/identifier> .", stream.getvalue().decode("utf-8"))
+        with self.assertRaises(ValueError):
+            stream_serialize_graph(g, stream, format="ttl")
+
+    def test_027_cached_date_to_literal(self):
+        dates = ["2000-01-01", "2000-01", "2000", "-0044", "2000-01-01T00:00:00", "2000-01-01T00:00:00Z",
+                 "2000-01-01T00:00:00+01:00", "Before Christ", "", None, "2000"]
+        for date in dates:
+            self.assertEqual(cached_date_to_literal(date), date_to_literal(date))
+            self.assertEqual(cached_date_to_literal(date, "unknown", "de"), date_to_literal(date, "unknown", "de"))
+        self.assertIs(cached_date_to_literal("1900"), cached_date_to_literal("1900"))
+        literals = dates_to_literals(dates)
+        self.assertEqual(literals, [date_to_literal(x) for x in dates])
+        self.assertIs(literals[2], literals[-1])
+        self.assertEqual(literals[3], Literal("-0044", datatype=URIRef("http://www.w3.org/2001/XMLSchema#gYear")))
+
+    def test_028_extract_begin_end_many(self):
+        xml = parse_xml("./tests/sample.xml")
+        nodes = get_elements_by_xpath(xml, "//*")
+        nodes += [{"from": "1900", "to-iso": "1910", "to": "1905"}, {"when": "1900", "notAfter": "1901"}, {}]
+        for fill_missing in (True, False):
+            self.assertEqual(
+                extract_begin_end_many(nodes, fill_missing=fill_missing),
+                [extract_begin_end(x, fill_missing=fill_missing) for x in nodes]
+            )
+        self.assertIn(("1902", "1944"), extract_begin_end_many(nodes))
+        self.assertIn(("1902", None), extract_begin_end_many(nodes[:-3] + [{"notBefore": "1902"}], fill_missing=False))
+
+    def test_029_create_literals(self):
+        xml = parse_xml("./tests/sample.xml")
+        nodes = get_elements_by_xpath(xml, "//xmlns:persName|//xmlns:placeName|//xmlns:test|//xmlns:occupation")
+        nodes.append(ET.fromstring("<persName>Hansi<!-- comment --></persName>"))
+        for default_lang, enforce_default_lang in ((False, False), ("en", False), ("en", True)):
+            literals = create_literals(nodes, "Name: ", default_lang, enforce_default_lang)
+            self.assertEqual(literals, [create_literal(x, "Name: ", default_lang, enforce_default_lang) for x in nodes])
+        self.assertIn(Literal("Name: Gulbransson, Olaf", lang="und"), create_literals(nodes, "Name: ", "en"))
+        self.assertEqual(literals[-1], Literal("Name: Hansi", lang="en"))
+        self.assertEqual(create_literal(get_element_by_xpath(xml, "//xmlns:test"), ""), Literal("undefined"))
+
+    def test_030_create_disk_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.sqlite")
+            with self.assertRaises(ValueError):
+                create_disk_store(path, create=False)
+            store = create_disk_store(path, bulk_load=True)
+            g = create_empty_graph(
+                namespaces=NAMESPACES,
+                identifier=URIRef("http://example.com/identifier"),
+                store=store
+            )
+            map_persons(g, parse_xml("./tests/sample.xml"))
+            with TripleBuffer(graph=g) as buffer:
+                buffer.add_value(URIRef("http://example.com/subject"), Literal("1905-07-04", datatype=XSD.date))
+            expected = set(g)
+            store.close()
+            store = create_disk_store(path, create=False)
+            self.assertEqual(store.namespace("cidoc"), URIRef(NAMESPACES["cidoc"]))
+            g = create_empty_graph(identifier=URIRef("http://example.com/identifier"), store=store)
+            self.assertEqual(len(g), 10)
+            self.assertEqual(set(g), expected)
+            conjunctive_graph = create_conjunctive_graph(store=store)
+            self.assertEqual(len(conjunctive_graph), 10)
+            self.assertEqual([x.identifier for x in conjunctive_graph.contexts()], [g.identifier])
+            self.assertIn("ns1:identifier", serialize_graph(conjunctive_graph, format="trig", to_file=None))
+            g.remove((None, RDF.type, None))
+            self.assertEqual(len(g), 6)
+            self.assertEqual(len(list(g.triples((None, RDFS.label, Literal("Ronja, Hanna", lang="und"))))), 1)
+            store.remove_graph(g)
+            self.assertEqual(list(conjunctive_graph.contexts()), [])
+            g.add((URIRef("http://example.com/subject"), RDF.value, Literal(1)))
+            self.assertEqual([x.identifier for x in conjunctive_graph.contexts()], [g.identifier])
+            store.commit()
+            other = create_empty_graph(identifier=URIRef("http://example.com/other"), store=store)
+            other.add((URIRef("http://example.com/subject"), RDF.value, Literal(2)))
+            store.rollback()
+            other.add((URIRef("http://example.com/subject"), RDF.value, Literal(2)))
+            self.assertEqual({x.identifier for x in conjunctive_graph.contexts()}, {g.identifier, other.identifier})
+            store.close()
+            path = os.path.join(tmp, "default.sqlite")
+            store = create_disk_store(path)
+            g = create_empty_graph(store=store)
+            map_persons(g, parse_xml("./tests/sample.xml"))
+            with TripleBuffer(create_conjunctive_graph(store=store)) as buffer:
+                buffer.add_value(URIRef("http://example.com/subject"), Literal(1))
+            store.close()
+            store = create_disk_store(path, create=False)
+            g = create_empty_graph(store=store)
+            self.assertEqual(g.identifier, DISK_GRAPH_IDENTIFIER)
+            self.assertEqual(len(g), 10)
+            self.assertEqual([x.identifier for x in create_conjunctive_graph(store=store).contexts()],
+                             [DISK_GRAPH_IDENTIFIER])
+            store.close()
+
+    def test_031_build_graph_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_files = [os.path.join(tmp, "a.xml"), os.path.join(tmp, "b.xml")]
+            for x in xml_files:
+                shutil.copy("./tests/sample.xml", x)
+            manifest_file = os.path.join(tmp, "manifest.json")
+            store = create_disk_store(os.path.join(tmp, "graph.sqlite"))
+            g = create_conjunctive_graph(store=store)
+            result = build_graph_incremental(xml_files, map_persons, g, manifest_file)
+            self.assertEqual(result["changed"], xml_files)
+            self.assertEqual(len(list(g.contexts())), 2)
+            self.assertEqual(len(list(g.quads())), 18)
+            result = build_graph_incremental(xml_files, map_persons, g, manifest_file)
+            self.assertEqual(result["unchanged"], xml_files)
+            with open(xml_files[1], "w") as f:
+                f.write("""<TEI xmlns="http://www.tei-c.org/ns/1.0"><person xml:id="new"/></TEI>""")
+            result = build_graph_incremental(xml_files, map_persons, g, manifest_file)
+            self.assertEqual(result["changed"], xml_files[1:])
+            self.assertEqual(len(list(g.quads())), 10)
+            self.assertIn((URIRef("http://example.com/person/new"), RDF.type, None), g)
+            result = build_graph_incremental(xml_files[1:], map_persons, g, manifest_file)
+            self.assertEqual(result["removed"], xml_files[:1])
+            self.assertEqual(len(list(g.contexts())), 1)
+            self.assertEqual(len(g), 1)
+            store.close()
+
+    def test_032_uri_template(self):
+        xml = parse_xml("./tests/sample.xml")
+        elements = get_elements_by_xpath(xml, "//xmlns:person")
+        template = URITemplate(["prefix", "attribute", "number", "node"], prefix="http://example.com/", number=2)
+        self.assertEqual(template(elements[0]), URIRef("http://example.com/DWpers0091/2/person"))
+        self.assertEqual(
+            template.many(elements),
+            [create_uri_from_node_tag_by_custom_sequence(
+                node=[x, 3],
+                prefix=["http://example.com/", 0],
+                attribute=["{http://www.w3.org/XML/1998/namespace}id", 1],
+                number=[2, 2]
+            ) for x in elements]
+        )
+        self.assertEqual(template(elements[0], number=5), URIRef("http://example.com/DWpers0091/5/person"))
+        template = URITemplate(["prefix", "node", "generate_uuid"], prefix="http://example.com")
+        self.assertTrue(template(elements[0]).startswith("http://example.com/person/"))
+        self.assertNotEqual(template(elements[0]), template(elements[0]))
+        with self.assertRaises(ValueError):
+            URITemplate(["prefix", "foo"])
+
+    def test_033_uri_interner(self):
+        xml = parse_xml("./tests/sample.xml")
+        elements = get_elements_by_xpath(xml, "//xmlns:person") * 2
+        self.assertEqual(tag_local_name("{http://www.tei-c.org/ns/1.0}persName"), "persname")
+        interner = URIInterner(maxsize=3)
+        uris = [create_uri_from_node_tag(x, "http://example.com/", interner=interner) for x in elements]
+        self.assertEqual(uris, [create_uri_from_node_tag(x, "http://example.com/") for x in elements])
+        self.assertEqual((interner.hits, interner.misses, len(interner)), (0, 8, 3))
+        interner = URIInterner()
+        uris = [create_uri_from_node_tag(x, "http://example.com/", interner=interner) for x in elements]
+        self.assertIs(uris[0], uris[4])
+        self.assertEqual((interner.hits, interner.misses, len(interner)), (4, 4, 4))
+        uri = create_uri_from_node_tag(elements[0], "http://example.com/", number=1, interner=interner)
+        self.assertEqual(uri, URIRef("http://example.com/person/DWpers0091/1"))
+        uri = create_uri_from_node_tag(elements[0], "http://example.com/", generate_uuid=True, interner=interner)
+        self.assertEqual(len(interner), 5)
+        interner.clear()
+        self.assertEqual((interner.hits, interner.misses, len(interner)), (0, 0, 0))
+
+    def test_034_iter_remote_xml(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHTTPRequestHandler, directory="./tests"))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        async def collect(urls):
+            return [x async for x in iter_remote_xml(urls, max_concurrency=3)]
+
+        try:
+            urls = [f"http://127.0.0.1:{server.server_port}/sample.xml?{x}" for x in range(10)]
+            result = asyncio.run(collect(urls))
+            self.assertEqual(sorted(x for x, _ in result), sorted(urls))
+            for _, root in result:
+                self.assertEqual(len(get_elements_by_xpath(root, "//xmlns:person")), 4)
+            with self.assertRaises(HTTPError):
+                asyncio.run(collect(urls[:2] + [f"http://127.0.0.1:{server.server_port}/missing.xml"]))
+
+            async def hold_first(urls):
+                documents = iter_remote_xml(urls, max_concurrency=2)
+                await documents.__anext__()
+                await asyncio.sleep(0.5)
+                await documents.aclose()
+
+            requests = []
+            # own server, downloads left over from the failed run above must not be counted
+            counting_server = ThreadingHTTPServer(
+                ("127.0.0.1", 0), partial(CountingHTTPRequestHandler, requests, directory="./tests")
+            )
+            threading.Thread(target=counting_server.serve_forever, daemon=True).start()
+            try:
+                asyncio.run(hold_first([f"http://127.0.0.1:{counting_server.server_port}/sample.xml?{x}"
+                                        for x in range(10)]))
+            finally:
+                counting_server.shutdown()
+                counting_server.server_close()
+            self.assertLessEqual(len(requests), 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_035_instrumentation(self):
+        calls = []
+        self.assertFalse(hasattr(parse_xml, "__wrapped__"))
+
+        class Proxy:
+            def __hash__(self):
+                raise RuntimeError("unbound proxy")
+
+        proxy_module = types.ModuleType("proxy_module")
+        proxy_module.proxy = Proxy()
+        proxy_module.parse_xml = parse_xml
+        sys.modules["proxy_module"] = proxy_module
+        try:
+            stats = enable_instrumentation(callback=lambda name, seconds: calls.append(name), modules=[__name__])
+        finally:
+            del sys.modules["proxy_module"]
+        try:
+            self.assertIs(proxy_module.parse_xml, parse_xml.__wrapped__)
+            self.assertTrue(hasattr(parse_xml, "__wrapped__"))
+            with TripleBuffer(create_empty_graph(store=create_memory_store()), batch_size=2) as buffer:
+                for x in range(3):
+                    buffer.add_value(URIRef("http://example.com/"), Literal(x))
+            interner = URIInterner()
+            register_cache("test.interner", interner)
+            self.assertIs(get_stats(), stats)
+            g = create_empty_graph(store=create_memory_store())
+            map_persons(g, parse_xml("./tests/sample.xml"))
+            for x in get_elements_by_xpath(parse_xml("./tests/sample.xml"), "//xmlns:person") * 2:
+                create_uri_from_node_tag(x, "http://example.com/", interner=interner)
+            cached_date_to_literal("1234")
+            cached_date_to_literal("1234")
+        finally:
+            self.assertIs(disable_instrumentation(), stats)
+        self.assertIsNone(get_stats())
+        self.assertFalse(hasattr(parse_xml, "__wrapped__"))
+        self.assertEqual(stats.triples[RDF.value], 3)
+        self.assertEqual(stats.calls["xml.parse_xml"], 2)
+        self.assertEqual(stats.calls["xml.create_uri_from_node_tag"], 12)
+        self.assertEqual(stats.calls["graph.create_type_triple"], 4)
+        self.assertEqual(stats.triples[RDF.type], 4)
+        self.assertEqual(stats.triples[RDFS.label], 5)
+        self.assertGreater(stats.seconds["xml.create_literal"], 0)
+        self.assertEqual(calls.count("xml.create_literal"), 5)
+        caches = stats.caches()
+        self.assertEqual(caches["test.interner"], {"hits": 4, "misses": 4, "hit_rate": 0.5})
+        self.assertEqual(caches["string_utils.cached_date_to_literal"]["hits"], 1)
+        self.assertIn("xml.compile_xpath", stats.as_dict()["caches"])
+        self.assertIn("xml.parse_xml", stats.report())
+        create_uri_from_node_tag(parse_xml("./tests/sample.xml")[0], "http://example.com/")
+        self.assertEqual(stats.calls["xml.parse_xml"], 2)
+
+    def test_036_create_columnar_store(self):
+        g = create_empty_graph(store=create_memory_store())
+        map_persons(g, parse_xml("./tests/sample.xml"))
+        g.add((URIRef("http://example.com/subject"), RDF.value, Literal('"quoted"\nline', lang="de")))
+        columnar = create_columnar_store()
+        columnar.add_triples(g).add_triples(g)
+        columnar.addN((s, p, o, g) for s, p, o in g)
+        self.assertEqual(len(columnar), 30)
+        self.assertEqual(columnar.dedupe(), 10)
+        self.assertEqual(set(columnar), set(g))
+        stream = io.BytesIO()
+        self.assertEqual(columnar.to_ntriples(stream), 10)
+        expected = io.BytesIO()
+        stream_serialize_graph(g, expected)
+        self.assertEqual(sorted(stream.getvalue().splitlines()), sorted(expected.getvalue().splitlines()))
+        graph = columnar.to_graph(create_conjunctive_graph(store=create_memory_store()), batch_size=3)
+        self.assertEqual(set(graph), set(g))
+        for packed_key_bits in (64, 0):
+            with mock.patch("acdh_graph_pyutils.columnar.PACKED_KEY_BITS", packed_key_bits):
+                columnar = create_columnar_store().add_triples(g).add_triples(reversed(list(g))).add_triples(g)
+                self.assertEqual(columnar.dedupe(chunk_size=4), 10)
+                ids = list(zip(columnar.subjects, columnar.predicates, columnar.objects))
+                self.assertEqual(ids, sorted(set(ids)))
+                self.assertEqual(set(columnar), set(g))
+
+    def test_037_normalize_strings(self):
+        strings = ["  This is a    test   string.  ", "\n\tGulbransson,\n   Olaf ", "", "Cafe\u0301  Wien"]
+        self.assertEqual(normalize_strings(strings), [normalize_string(x) for x in strings])
+        self.assertEqual(normalize_strings(strings, nfc=True)[3], "Caf\u00e9 Wien")
+        self.assertEqual(normalize_string(strings[3], nfc=True), "Caf\u00e9 Wien")
+        self.assertEqual(normalize_string(strings[3]), "Cafe\u0301 Wien")
+        for x in strings:
+            self.assertEqual(cached_normalize_string(x), normalize_string(x))
+            self.assertEqual(cached_normalize_string(x, nfc=True), normalize_string(x, nfc=True))
+
+    def test_038_merge_graphs(self):
+        g = create_empty_graph(identifier=URIRef("http://example.com/a"), store=create_memory_store())
+        map_persons(g, parse_xml("./tests/sample.xml"))
+        data = g.serialize(format="nt", encoding="utf-8")
+        conjunctive_graph = merge_graphs(
+            [g, (URIRef("http://example.com/b"), data), (URIRef("http://example.com/c"), data.decode("utf-8"))],
+            batch_size=4
+        )
+        self.assertEqual(
+            sorted(x.identifier for x in conjunctive_graph.contexts()),
+            [URIRef("http://example.com/a"), URIRef("http://example.com/b"), URIRef("http://example.com/c")]
+        )
+        self.assertEqual(len(list(conjunctive_graph.quads())), 27)
+        self.assertEqual(set(conjunctive_graph.get_context(URIRef("http://example.com/b"))), set(g))
+        stream = io.BytesIO()
+        self.assertEqual(stream_serialize_graph(conjunctive_graph, stream, format="nquads"), 27)
+        merge_graphs([(URIRef("http://example.com/d"), data)], conjunctive_graph)
+        self.assertEqual(len(list(conjunctive_graph.contexts())), 4)
+
+    def test_039_lazy_imports(self):
+        code = (
+            "import sys, acdh_graph_pyutils.xml, acdh_graph_pyutils.graph, acdh_graph_pyutils.string_utils; "
+            "print(sorted(x for x in ('acdh_tei_pyutils', 'rdflib.plugins.parsers.ntriples') if x in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+        literal = create_literal(get_element_by_xpath(parse_xml("./tests/sample.xml"), "//xmlns:persName"), "")
+        self.assertEqual(literal, Literal("Gulbransson, Olaf Leonhard"))
+
+    def test_040_create_literals_from_coordinates(self):
+        xml = parse_xml("./tests/sample.xml")
+        elements = get_elements_by_xpath(xml, "//xmlns:geo")
+        literals, errors = create_literals_from_coordinates(elements)
+        self.assertEqual(errors, [])
+        self.assertEqual(literals, [create_literal_from_coordinates(x) for x in elements])
+        literals, errors = create_literals_from_coordinates(
+            ["48.2066 16.37341", "48.2066", "abc 16.3", "nan 1", " 1.5   -2 "], swap=True
+        )
+        self.assertEqual(literals[0], Literal("Point(16.37341 48.2066)", datatype=GEO['wktLiteral']))
+        self.assertEqual(literals[4], Literal("Point(-2 1.5)", datatype=GEO['wktLiteral']))
+        self.assertEqual(literals[1:4], [None, None, None])
+        self.assertEqual([x[0] for x in errors], [1, 2, 3])
+        literals, errors = create_literals_from_coordinates(["1.5,2"], split_char=",")
+        self.assertEqual(literals, [Literal("Point(1.5 2)", datatype=GEO['wktLiteral'])])
+
+    def test_041_compile_mapping(self):
+        spec = {"entities": [
+            {
+                "tag": "tei:person",
+                "uri": {"prefix": "http://example.com/"},
+                "type": "cidoc:E21_Person",
+                "fields": [
+                    {"path": "tei:persName", "predicate": "rdfs:label", "lang": "en"},
+                    {"path": "tei:death/tei:date", "kind": "date",
+                     "begin": "cidoc:P82a_begin_of_the_begin", "end": "cidoc:P82b_end_of_the_end"},
+                    {"path": "tei:idno", "kind": "uri", "predicate": "owl:sameAs", "where": {"type": "GND"}},
+                ],
+            },
+            {
+                "tag": "tei:place",
+                "uri": {"prefix": "http://example.com/"},
+                "type": ["cidoc:E53_Place"],
+                "fields": [
+                    {"path": "tei:location/tei:geo", "kind": "coordinates", "predicate": "<http://example.com/wkt>"},
+                    {"path": ".", "kind": "uri", "attribute": "xml:id", "predicate": "rdfs:seeAlso"},
+                ],
+            },
+        ]}
+        g = compile_mapping(spec).run(parse_xml("./tests/sample.xml"))
+        expected = create_empty_graph(store=create_memory_store())
+        map_persons(expected, parse_xml("./tests/sample.xml"))
+        xml = parse_xml("./tests/sample.xml")
+        cidoc = NAMESPACES["cidoc"]
+        for x in get_elements_by_xpath(xml, "//xmlns:person"):
+            uri = create_uri_from_node_tag(node=x, prefix="http://example.com/")
+            for date in get_elements_by_xpath(x, "./xmlns:death/xmlns:date"):
+                begin, end = extract_begin_end(date)
+                expected.add((uri, cidoc["P82a_begin_of_the_begin"], date_to_literal(begin)))
+                expected.add((uri, cidoc["P82b_end_of_the_end"], date_to_literal(end)))
+            for idno in get_elements_by_xpath(x, "./xmlns:idno[@type='GND']"):
+                expected.add((uri, OWL.sameAs, URIRef(idno.text)))
+        for x in get_elements_by_xpath(xml, "//xmlns:place"):
+            uri = create_uri_from_node_tag(node=x, prefix="http://example.com/")
+            expected.add((uri, RDF.type, cidoc["E53_Place"]))
+            expected.add((uri, RDFS.seeAlso, URIRef(x.get("{http://www.w3.org/XML/1998/namespace}id"))))
+            for geo in get_elements_by_xpath(x, "./xmlns:location/xmlns:geo"):
+                expected.add((uri, URIRef("http://example.com/wkt"), create_literal_from_coordinates(geo)))
+        self.assertEqual(set(g), set(expected))
+        self.assertEqual(len(g), 20)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mapping.json")
+            with open(path, "w") as f:
+                json.dump(spec, f)
+            self.assertEqual(load_mapping(path), spec)
+        with self.assertRaises(ValueError):
+            compile_mapping({"entities": [{"tag": "foo:person", "uri": {"prefix": "http://example.com/"}}]})
+        with self.assertRaises(ValueError):
+            compile_mapping({"entities": [{"tag": "tei:person", "uri": {"prefix": "http://example.com/"},
+                                           "fields": [{"predicate": "foo:bar"}]}]})
+
+    def test_042_sameas_index(self):
+        ex = Namespace("http://example.com/")
+        gnd = Namespace("https://d-nb.info/gnd/")
+        wd = Namespace("http://www.wikidata.org/entity/")
+        index = SameAsIndex()
+        g = create_empty_graph(store=create_memory_store())
+        create_sameAs_triple(g, ex["a"], gnd["1"], index=index)
+        create_sameAs_triple(g, wd["Q1"], gnd["1"], index=index)
+        create_sameAs_triple(g, ex["b"], gnd["2"], index=index)
+        with TripleBuffer(g) as buffer:
+            buffer.add_sameAs(ex["c"], wd["Q1"], index=index)
+        g.add((ex["c"], RDFS.label, Literal("c")))
+        g.add((ex["b"], RDFS.seeAlso, wd["Q1"]))
+        self.assertEqual(len(index), 6)
+        self.assertIn(wd["Q1"], index)
+        self.assertEqual(index.canonical(wd["Q1"]), ex["a"])
+        self.assertEqual(index.canonical(ex["c"]), ex["a"])
+        self.assertEqual(index.canonical(gnd["2"]), ex["b"])
+        self.assertEqual(index.canonical(ex["d"]), ex["d"])
+        self.assertEqual(index.cluster(ex["c"])[0], ex["a"])
+        self.assertEqual(set(index.cluster(ex["c"])), {ex["a"], gnd["1"], wd["Q1"], ex["c"]})
+        self.assertEqual(sorted(len(x) for x in index.clusters()), [2, 4])
+        self.assertEqual(len(list(index.closure())), 4 * 3 + 2 * 1)
+        self.assertIn((ex["c"], OWL.sameAs, gnd["1"]), set(index.closure()))
+        self.assertEqual(len(list(index.closure(reflexive=True))), 16 + 4)
+        self.assertEqual(
+            sorted(map(set, SameAsIndex.from_graph(g).clusters()), key=len),
+            sorted(map(set, index.clusters()), key=len),
+        )
+        smushed = index.smush(g)
+        self.assertIn((ex["a"], RDFS.label, Literal("c")), smushed)
+        self.assertIn((ex["b"], RDFS.seeAlso, ex["a"]), smushed)
+        self.assertIn((ex["a"], OWL.sameAs, ex["c"]), smushed)
+        self.assertEqual(len(smushed), 2 + 3 + 1)
+        self.assertEqual(len(index.smush(g, keep_sameAs=False)), 2)
+
+    def test_043_export_graph_sharded(self):
+        g = create_empty_graph(store=create_memory_store())
+        map_persons(g, parse_xml("./tests/sample.xml"))
+        for i in range(100):
+            g.add((URIRef(f"http://example.com/{i}"), RDFS.label, Literal(f"label {i}", lang="de")))
+        g.add((BNode(), RDFS.label, Literal('a "b"\nc\\')))
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = export_graph_sharded(g, tmp, shards=3, max_workers=2, chunk_size=7)
+            self.assertEqual(manifest["triples"], len(g))
+            self.assertEqual([x["file"] for x in manifest["shards"]],
+                             ["graph-00001.nt.gz", "graph-00002.nt.gz", "graph-00003.nt.gz"])
+            with open(os.path.join(tmp, "manifest.json")) as f:
+                self.assertEqual(json.load(f), manifest)
+            merged = Graph()
+            for index, shard in enumerate(manifest["shards"]):
+                part = Graph()
+                with gzip.open(os.path.join(tmp, shard["file"])) as f:
+                    part.parse(f, format="nt")
+                self.assertEqual(len(part), shard["triples"])
+                self.assertTrue(all(shard_of(s, 3) == index for s in part.subjects() if not isinstance(s, BNode)))
+                merged += part
+            self.assertEqual(len(merged), len(g))
+            self.assertEqual({x for x in merged if not isinstance(x[0], BNode)},
+                             {x for x in g if not isinstance(x[0], BNode)})
+            self.assertIn(Literal('a "b"\nc\\'), set(merged.objects()))
+            manifest = export_graph_sharded(g, tmp, shards=2, name="plain", compress=False, max_workers=1)
+            self.assertEqual(manifest["shards"][0]["file"], "plain-00001.nt")
+            part = Graph().parse(os.path.join(tmp, "plain-00002.nt"), format="nt")
+            self.assertEqual(len(part), manifest["shards"][1]["triples"])
+            g.add((URIRef("http://example.com/a b>"), RDFS.label, Literal("invalid")))
+            with self.assertRaises(Exception):
+                stream_serialize_graph(g, io.BytesIO())
+            with self.assertRaises(Exception):
+                export_graph_sharded(g, tmp, shards=2, max_workers=1)
+
+    def test_044_build_graph_parallel_split(self):
+        serial_graph = create_empty_graph(store=create_memory_store())
+        map_persons(serial_graph, parse_xml("./tests/sample.xml"))
+        g = build_graph_parallel_split("./tests/sample.xml", "person", map_persons, max_workers=2, batch_size=3)
+        self.assertEqual(set(g), set(serial_graph))
+        conjunctive_graph = create_conjunctive_graph(store=create_memory_store())
+        build_graph_parallel_split("./tests/sample.xml", "person", map_persons, graph=conjunctive_graph, batch_size=3)
+        self.assertEqual(len(list(conjunctive_graph.contexts())), 1)
+        self.assertEqual(set(conjunctive_graph.default_context), set(serial_graph))
+        data = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<tei:TEI xmlns:tei="http://www.tei-c.org/ns/1.0" xmlns:x="http://example.com/x">'
+            '<tei:listPerson><tei:person xml:id="a"><tei:person xml:id="nested"/></tei:person>'
+            '<tei:person xml:id="b"/><tei:personGrp/>'
+            '<tei:person xml:id="c" x:ref="Wien"><tei:persName>Ö &amp; "c"</tei:persName></tei:person>'
+            '</tei:listPerson></tei:TEI>'
+        ).encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "persons.xml")
+            with open(path, "wb") as f:
+                f.write(data)
+            ranges = find_element_ranges(path, "tei:person")
+            self.assertEqual(len(ranges), 3)
+            self.assertEqual(data[ranges[1][0]:ranges[1][1]], b'<tei:person xml:id="b"/>')
+            self.assertEqual(find_element_ranges(path, "person"), [])
+            nsmap = extract_root_nsmap(path)
+            self.assertEqual(nsmap, {"tei": "http://www.tei-c.org/ns/1.0", "x": "http://example.com/x"})
+            fragment = parse_xml_fragments(path, ranges, nsmap)
+            persons = fragment.findall("{http://www.tei-c.org/ns/1.0}person")
+            self.assertEqual([x.get("{http://www.w3.org/XML/1998/namespace}id") for x in persons], ["a", "b", "c"])
+            self.assertEqual(persons[2].get("{http://example.com/x}ref"), "Wien")
+            self.assertEqual(persons[2][0].text, 'Ö & "c"')
+            with open(path, "wb") as f:
+                f.write(b'<listPerson><person n="a>b"/><person xml:id="x" n=\'c/>\'><persName/></person>'
+                        b'<person xml:id="y"/></listPerson>')
+            ranges = find_element_ranges(path, "person")
+            self.assertEqual(len(ranges), 3)
+            fragment = parse_xml_fragments(path, ranges, {})
+            self.assertEqual([x.get("n") for x in fragment], ["a>b", "c/>", None])
+            self.assertEqual(len(fragment[1]), 1)
+            with open(path, "wb") as f:
+                f.write(b'<listPerson><person xml:id="a"/>\n<!-- <person xml:id="removed"><persName/></person> -->'
+                        b'<note><![CDATA[<person xml:id="cdata"/>]]></note>'
+                        b'<person xml:id="b"><!-- </person> --><persName/></person></listPerson>')
+            ranges = find_element_ranges(path, "person")
+            fragment = parse_xml_fragments(path, ranges, {})
+            self.assertEqual([x.get("{http://www.w3.org/XML/1998/namespace}id") for x in fragment], ["a", "b"])
+            self.assertEqual(len(fragment[1].findall("persName")), 1)
+
+    def test_045_compute_delta(self):
+        ex = Namespace("http://example.com/")
+        old = create_empty_graph(store=create_memory_store())
+        map_persons(old, parse_xml("./tests/sample.xml"))
+        new = create_empty_graph(store=create_memory_store())
+        new += old
+        removed = next(iter(new.triples((None, RDFS.label, None))))
+        new.remove(removed)
+        new.add((ex["new"], RDFS.label, Literal('new "label"\n', lang="de")))
+        new.add((ex["new"], RDF.type, ex["Thing"]))
+        with tempfile.TemporaryDirectory() as tmp:
+            added_file = os.path.join(tmp, "added.nt")
+            removed_file = os.path.join(tmp, "removed.nt.gz")
+            result = compute_delta(old, new, added_file, removed_file)
+            self.assertEqual(result, {"added": 2, "removed": 1})
+            self.assertEqual(set(Graph().parse(added_file, format="nt")), set(new) - set(old))
+            with gzip.open(removed_file) as f:
+                self.assertEqual(set(Graph().parse(f, format="nt")), {removed})
+            old_file = os.path.join(tmp, "old.nt")
+            stream_serialize_graph(old, old_file)
+            with open(old_file, "a") as f:
+                f.write("# comment\n\n")
+            stream_serialize_graph(new, os.path.join(tmp, "new.nt.gz"))
+            sorted_file = os.path.join(tmp, "old.sorted.nt")
+            self.assertEqual(sort_ntriples(old_file, sorted_file, chunk_size=2), len(old))
+            with open(sorted_file) as f:
+                lines = f.readlines()
+            self.assertEqual(lines, sorted(set(lines)))
+            result = compute_delta(sorted_file, os.path.join(tmp, "new.nt.gz"), added_file, removed_file, chunk_size=3)
+            self.assertEqual(result, {"added": 2, "removed": 1})
+            self.assertEqual(list(diff_sorted_ntriples(["a\n", "c\n"], ["b\n", "c\n", "d\n"])),
+                             [("-", "a\n"), ("+", "b\n"), ("+", "d\n")])
+            update = io.BytesIO()
+            count = delta_to_sparql_update(added_file, removed_file, update, graph=ex["graph"], batch_size=1)
+            self.assertEqual(count, 3)
+            data = update.getvalue().decode("utf-8")
+            self.assertEqual(data.count("DELETE DATA"), 1)
+            self.assertEqual(data.count("INSERT DATA"), 2)
+            target = create_conjunctive_graph(store=create_memory_store())
+            context = target.get_context(ex["graph"])
+            context += old
+            target.update(data)
+            self.assertEqual(set(context), set(new))
+            with open(added_file, "w") as f:
+                f.write('<http://example.com/s> <http://example.com/p> "see <x> _:b1" .\n')
+                f.write("<http://example.com/s> <http://example.com/p> <http://example.com/o> .\n")
+            self.assertEqual(delta_to_sparql_update(removed_file, added_file, io.BytesIO()), 2)
+            for line in ("_:b0 <http://example.com/p> <http://example.com/o> .\n",
+                         "<http://example.com/s> <http://example.com/p>   _:b1 .\n"):
+                with open(added_file, "w") as f:
+                    f.write(line)
+                update = io.BytesIO()
+                with self.assertRaises(ValueError):
+                    delta_to_sparql_update(removed_file, added_file, update)
+                self.assertEqual(update.getvalue(), b"")